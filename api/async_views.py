@@ -0,0 +1,197 @@
+# Async variants of login, signup and change-password for the ASGI
+# deployment (main/asgi.py). They answer exactly like the views in
+# api/views.py, but the password hashing runs on the bounded pool from
+# api.hashing, so a burst of logins can't tie up the workers serving
+# everything else.
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+from .bloom import get_username_filter
+from .hashing import HashingPoolFull, get_hashing_pool
+from .serializers import password_format_error, signup_credentials_error
+from .throttling import get_login_throttle, throttled_payload
+from .tokens import bump_token_version, login_tokens
+from .views import ChangePasswordView
+
+User = get_user_model()
+
+
+def _throttled(wait):
+    response = JsonResponse(throttled_payload(wait), status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+def _busy():
+    response = JsonResponse(
+        {'error': 'Server busy', 'message': 'Too many logins in progress, please try again shortly.'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response['Retry-After'] = '1'
+    return response
+
+
+def _parse(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@sync_to_async
+def _get_user(username):
+    return User.objects.filter(username=username).first()
+
+
+@sync_to_async
+def _create_user(username, encoded_password):
+    return User.objects.create(username=User.normalize_username(username), password=encoded_password)
+
+
+@sync_to_async
+def _authenticate(request):
+    # Reuse the DRF authenticators of the sync view for the token header.
+    drf_request = Request(request, authenticators=[auth() for auth in ChangePasswordView.authentication_classes])
+    try:
+        return drf_request.user
+    except exceptions.APIException:
+        return None
+
+
+@sync_to_async
+def _store_password(user, encoded_password):
+    user.password = encoded_password
+    user.save()
+    # Invalidate existing tokens for the user
+    Token.objects.filter(user=user).delete()
+    bump_token_version(user)
+
+
+async def signup(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    wait = get_login_throttle().check(request, 'signup')
+    if wait:
+        return _throttled(wait)
+    data = _parse(request) if request.content_type == 'application/json' else None
+    if data is None:
+        return JsonResponse({'error': 'Request data is not in JSON format', 'message': 'Please send a valid JSON payload.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    username = data.get('username')
+    password = data.get('password')
+    error = signup_credentials_error(username, password)
+    if error is not None:
+        return JsonResponse(error, status=status.HTTP_400_BAD_REQUEST)
+    if await sync_to_async(get_username_filter().is_taken)(username):
+        return JsonResponse({'error': 'Username is already taken', 'message': 'The username you provided is already taken.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        encoded = await get_hashing_pool().make_password(password)
+    except HashingPoolFull:
+        return _busy()
+
+    try:
+        user = await _create_user(username, encoded)
+    except IntegrityError:
+        return JsonResponse({'error': 'Username is already taken', 'message': 'The username you provided is already taken.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    response_data = await sync_to_async(login_tokens)(user)
+    response_data['csrf_token'] = get_token(request)
+    return JsonResponse(response_data, status=status.HTTP_201_CREATED)
+
+
+async def login(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    data = _parse(request)
+    if data is None:
+        return JsonResponse({'error': 'Invalid request data', 'message': 'you have no keys in your request, or your key has no value'},
+                            status=status.HTTP_400_BAD_REQUEST)
+    if len(data) != 2 or 'username' not in data or 'password' not in data:
+        return JsonResponse({'error': 'Invalid request data', 'message': 'please make sure of your keys and its value'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    # rejected before any query or password hashing
+    wait = get_login_throttle().check(request, 'login', data['username'])
+    if wait:
+        return _throttled(wait)
+
+    user = await _get_user(data['username'])
+    if user is None:
+        return JsonResponse({'error': 'Invalid username ', 'message': 'your username is incorrect'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        password_valid = await get_hashing_pool().check_password(data['password'], user.password)
+    except HashingPoolFull:
+        return _busy()
+    if not password_valid:
+        return JsonResponse({'error': 'Invalid password or password', 'message': 'your password is incorrect'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    response_data = await sync_to_async(login_tokens)(user)
+    response_data['csrf_token'] = get_token(request)
+    return JsonResponse(response_data, status=status.HTTP_201_CREATED)
+
+
+async def change_password(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    user = await _authenticate(request)
+    if user is None or not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+    wait = get_login_throttle().check(request, 'change-password', user.get_username())
+    if wait:
+        return _throttled(wait)
+    data = _parse(request) or {}
+    old_password = data.get('old_password')
+    new_password = data.get('new_password')
+    confirm_password = data.get('confirm_password')
+
+    # the stored hash may be deferred on a signed-token user
+    encoded = await sync_to_async(lambda: user.password)()
+    pool = get_hashing_pool()
+    try:
+        old_password_valid = await pool.check_password(old_password, encoded)
+    except HashingPoolFull:
+        return _busy()
+    if not old_password_valid:
+        return JsonResponse({'error': 'Old password is incorrect', 'message': 'Old password is incorrect try again.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+    error = password_format_error(new_password)
+    if error is not None:
+        return JsonResponse(error, status=status.HTTP_400_BAD_REQUEST)
+    if new_password != confirm_password:
+        return JsonResponse({'error': 'Passwords do not match', 'message': 'Your passwords  is not match try again.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+    if new_password == old_password:
+        return JsonResponse({'error': 'New password must be different from old password', 'message': 'Old password is same as the new one try change it.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        encoded = await pool.make_password(new_password)
+    except HashingPoolFull:
+        return _busy()
+    await _store_password(user, encoded)
+    return JsonResponse({'success': 'Password has been changed', 'message': 'Congratulations.'}, status=status.HTTP_200_OK)
+
+
+# csrf_exempt() isn't async-aware on Django 3.2, mark the views directly
+# like the sync login view is exempted.
+login.csrf_exempt = True
+signup.csrf_exempt = True
+change_password.csrf_exempt = True
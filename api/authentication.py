@@ -0,0 +1,204 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+from .tokens import get_token_version, read_access_token, user_from_claims
+
+DEFAULT_TOKEN_AUTH_CACHE = {
+    'BACKEND': 'local',
+    'CACHE_ALIAS': 'default',
+    # with 'local', how long another worker may keep accepting a revoked token
+    'TIMEOUT': 5,
+    'MAX_ENTRIES': 10000,
+}
+
+
+class LocalTokenCache:
+    """
+    Per-process LRU of token key -> user with a TTL on every entry.
+
+    A lookup that missed reads the database and then stores the result; if an
+    invalidation ran in between, the store is dropped, so a token deleted by
+    a password change can't be cached again from a stale read.
+
+    Invalidations only reach this process's entries; other workers drop
+    theirs when the TTL runs out, which is why it is kept to seconds.
+    """
+
+    def __init__(self, timeout, max_entries):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def epoch(self):
+        return self._epoch
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user
+
+    def set(self, key, user, epoch):
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            self._entries[key] = (user, time.monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            self._user_keys.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._epoch += 1
+            self._discard(key)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            self._epoch += 1
+            for key in self._user_keys.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._user_keys.get(entry[0].pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._user_keys[entry[0].pk]
+
+
+class SharedTokenCache:
+    """
+    Token key -> user kept in a Django cache shared by all workers.
+
+    Invalidating writes a marker instead of deleting the entry, and entries
+    are only ever written with ``add``; a lookup racing with an invalidation
+    therefore can't put the revoked token back.
+    """
+    prefix = 'auth-token:'
+    revoked = 'revoked'
+
+    def __init__(self, alias, timeout):
+        self.cache = caches[alias]
+        if isinstance(self.cache, LocMemCache):
+            raise ImproperlyConfigured(
+                f"TOKEN_AUTH_CACHE 'shared' needs a cache shared by the workers, {alias!r} is per process.")
+        self.timeout = timeout
+
+    def epoch(self):
+        return None
+
+    def get(self, key):
+        user = self.cache.get(self.prefix + key)
+        if user is None or user == self.revoked:
+            return None
+        return user
+
+    def set(self, key, user, epoch):
+        self.cache.add(self.prefix + key, user, self.timeout)
+
+    def delete(self, key):
+        self.cache.set(self.prefix + key, self.revoked, self.timeout)
+
+    def delete_user(self, user_id):
+        keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+        self.cache.set_many({self.prefix + key: self.revoked for key in keys}, self.timeout)
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                options = dict(DEFAULT_TOKEN_AUTH_CACHE, **getattr(settings, 'TOKEN_AUTH_CACHE', {}))
+                if options['BACKEND'] == 'shared':
+                    _token_cache = SharedTokenCache(options['CACHE_ALIAS'], options['TIMEOUT'])
+                else:
+                    _token_cache = LocalTokenCache(options['TIMEOUT'], options['MAX_ENTRIES'])
+    return _token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that skips the Token-join-User query on a cache hit.
+
+    Entries are dropped by the signals in api.signals whenever a token is
+    deleted (e.g. by ChangePasswordView) or its user is saved or deleted,
+    which covers deactivation.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        user = cache.get(key)
+        if user is not None:
+            # hand out a copy so one request can't change another's user
+            user = copy.copy(user)
+            return (user, Token(key=key, user=user))
+
+        epoch = cache.epoch()
+        user, token = super().authenticate_credentials(key)
+        cache.set(key, copy.copy(user), epoch)
+        return (user, token)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates ``Authorization: Bearer <token>`` with the HMAC-signed
+    access tokens from api.tokens.
+
+    The signature and expiry are checked locally and the token version comes
+    from the cache, so a request normally needs no database access at all.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+
+        try:
+            claims = read_access_token(auth[1].decode())
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        except (signing.BadSignature, UnicodeError):
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        if claims.get('v') != get_token_version(claims['uid']):
+            raise exceptions.AuthenticationFailed('Token has been revoked.')
+        return (user_from_claims(claims), claims)
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,132 @@
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import status
+
+from todo.models import Todo, TodoChangeCounter
+from todo.search import index_todos
+from .serializers import TodoSerializer
+
+BATCH_OPERATIONS = ('create', 'update', 'delete', 'toggle')
+
+
+def _insert_todos(user, todos):
+    if connection.features.can_return_rows_from_bulk_insert:
+        # bulk_create skips Todo.save, so number the changes here
+        first = TodoChangeCounter.allocate(user.pk, len(todos))
+        for offset, todo in enumerate(todos):
+            todo.change_seq = first + offset
+        Todo.objects.bulk_create(todos)
+        # bulk_create sends no post_save, keep the search index in step
+        index_todos(todos)
+    else:
+        # SQLite on Django 3.2 can't hand back the new primary keys from a
+        # bulk insert. Plain inserts inside the batch transaction are still
+        # cheap since there is a single commit.
+        for todo in todos:
+            todo.save(force_insert=True)
+
+
+def _target_id(operation):
+    try:
+        return int(operation.get('id'))
+    except (TypeError, ValueError):
+        return None
+
+
+def apply_todo_batch(user, operations):
+    """
+    Validate and apply a list of todo operations as one unit.
+
+    Returns ``(applied, results)``. Nothing is written unless every operation
+    is valid; ``results`` holds one entry per operation, in request order.
+    """
+    ids = {_target_id(op) for op in operations if isinstance(op, dict)} - {None}
+    results = []
+    created = []
+    changed = {}
+    deleted = set()
+    failed = False
+    now = timezone.now()
+
+    with transaction.atomic():
+        todos = Todo.objects.select_for_update().filter(user=user, id__in=ids).in_bulk()
+
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+                failed = True
+                results.append({'index': index, 'status': status.HTTP_400_BAD_REQUEST,
+                                'errors': {'op': [f'Must be one of: {", ".join(BATCH_OPERATIONS)}.']}})
+                continue
+
+            op = operation['op']
+            if op == 'create':
+                serializer = TodoSerializer(data=operation.get('data') or {})
+                if not serializer.is_valid():
+                    failed = True
+                    results.append({'index': index, 'op': op, 'status': status.HTTP_400_BAD_REQUEST,
+                                    'errors': serializer.errors})
+                    continue
+                todo = Todo(user=user, **serializer.validated_data)
+                created.append(todo)
+                results.append({'index': index, 'op': op, 'status': status.HTTP_201_CREATED, 'todo': todo})
+                continue
+
+            pk = _target_id(operation)
+            todo = todos.get(pk)
+            if todo is None or pk in deleted:
+                failed = True
+                results.append({'index': index, 'op': op, 'id': operation.get('id'),
+                                'status': status.HTTP_404_NOT_FOUND, 'errors': {'id': ['Not found.']}})
+                continue
+
+            if op == 'update':
+                serializer = TodoSerializer(todo, data=operation.get('data') or {}, partial=True)
+                if not serializer.is_valid():
+                    failed = True
+                    results.append({'index': index, 'op': op, 'id': pk, 'status': status.HTTP_400_BAD_REQUEST,
+                                    'errors': serializer.errors})
+                    continue
+                for field, value in serializer.validated_data.items():
+                    setattr(todo, field, value)
+                changed[pk] = todo
+            elif op == 'toggle':
+                todo.toggle_completed()
+                changed[pk] = todo
+            else:
+                deleted.add(pk)
+                changed.pop(pk, None)
+                results.append({'index': index, 'op': op, 'id': pk, 'status': status.HTTP_204_NO_CONTENT})
+                continue
+            # bulk_update skips auto_now, so stamp the ETag timestamp here
+            todo.updated = now
+            results.append({'index': index, 'op': op, 'id': pk, 'status': status.HTTP_200_OK,
+                            'todo': TodoSerializer(todo).data})
+
+        if failed:
+            # drop the row locks and hand back the per-operation errors
+            transaction.set_rollback(True)
+        else:
+            if created:
+                _insert_todos(user, created)
+            if changed:
+                first = TodoChangeCounter.allocate(user.pk, len(changed))
+                for offset, todo in enumerate(changed.values()):
+                    todo.change_seq = first + offset
+                Todo.objects.bulk_update(changed.values(),
+                                         ['title', 'memo', 'completed', 'completed_at', 'updated', 'change_seq'])
+                index_todos(changed.values())
+            if deleted:
+                Todo.objects.filter(user=user, id__in=deleted).delete()
+
+    for result in results:
+        todo = result.pop('todo', None)
+        if failed:
+            if 'errors' not in result:
+                # valid on its own, but rolled back with the rest of the batch
+                result['status'] = status.HTTP_424_FAILED_DEPENDENCY
+            continue
+        if todo is None:
+            continue
+        # creates are serialized only now, once the insert assigned the id
+        result['todo'] = TodoSerializer(todo).data if isinstance(todo, Todo) else todo
+    return not failed, results
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USERNAME_FILTER = {
+    'ERROR_RATE': 0.01,
+    'MIN_CAPACITY': 10000,
+    # other workers' signups only reach this process's filter by a rebuild
+    'REBUILD_INTERVAL': 300,
+}
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    ``in`` never gives a false negative for an added item; a positive may be
+    wrong with roughly ``error_rate`` probability while fewer than
+    ``capacity`` items were added.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # double hashing: the i-th position is h1 + i * h2
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class UsernameFilter:
+    """
+    Bloom filter of the existing usernames, so that checking a free username
+    doesn't need a query.
+
+    Built from the user table and rebuilt every ``REBUILD_INTERVAL`` seconds,
+    or sooner once it holds more names than it was sized for. The build runs
+    in a background thread and the new filter is swapped in when done;
+    lookups meanwhile use the old one, or the database before the first
+    build. Users created in this process are added as they're saved
+    (api.signals), to the filter being built too; deleted users stay in until
+    the next rebuild, which only costs a query.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        self._filter = None
+        self._built = 0
+        self._rebuilding = False
+        # names added while a rebuild reads the table, None when none runs
+        self._added = None
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.queries = 0
+
+    def _stale(self):
+        return (
+            self._filter is None
+            or self._filter.count > self._filter.capacity
+            or time.monotonic() - self._built > self.options['REBUILD_INTERVAL']
+        )
+
+    def _build(self):
+        User = get_user_model()
+        usernames = User.objects.values_list(User.USERNAME_FIELD, flat=True)
+        capacity = max(self.options['MIN_CAPACITY'], 2 * usernames.count())
+        bloom = BloomFilter(capacity, self.options['ERROR_RATE'])
+        for username in usernames.iterator(chunk_size=5000):
+            bloom.add(username)
+        return bloom
+
+    def rebuild(self):
+        """Build a filter from the user table and swap it in."""
+        with self._lock:
+            self._added = []
+        bloom = self._build()
+        with self._lock:
+            for username in self._added:
+                bloom.add(username)
+            self._filter, self._built, self._added = bloom, time.monotonic(), None
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('Could not rebuild the username filter')
+        finally:
+            with self._lock:
+                self._rebuilding = False
+            connection.close()
+
+    def _current(self):
+        if self._stale():
+            with self._lock:
+                start = self._stale() and not self._rebuilding
+                self._rebuilding = self._rebuilding or start
+            if start:
+                threading.Thread(target=self._rebuild_in_background, name='username-filter', daemon=True).start()
+        return self._filter
+
+    def add(self, username):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(username)
+            if self._added is not None:
+                self._added.append(username)
+
+    def is_taken(self, username):
+        self.lookups += 1
+        bloom = self._current()
+        if bloom is not None and username not in bloom:
+            return False
+        # a possible match or no filter yet, only the database can tell
+        self.queries += 1
+        User = get_user_model()
+        return User.objects.filter(**{User.USERNAME_FIELD: username}).exists()
+
+
+_username_filter = None
+_username_filter_lock = threading.Lock()
+
+
+def get_username_filter():
+    global _username_filter
+    if _username_filter is None:
+        with _username_filter_lock:
+            if _username_filter is None:
+                options = dict(DEFAULT_USERNAME_FILTER, **getattr(settings, 'USERNAME_FILTER', {}))
+                _username_filter = UsernameFilter(options)
+    return _username_filter
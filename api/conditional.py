@@ -0,0 +1,89 @@
+import functools
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def queryset_state(queryset, timestamp_field='updated'):
+    """
+    Row count and latest ``timestamp_field`` of ``queryset``, in one query.
+
+    Any create or edit moves the timestamp and any delete changes the count,
+    so together they identify the contents of the queryset.
+    """
+    state = queryset.aggregate(count=Count('pk'), latest=Max(timestamp_field))
+    return f"{state['count']}:{state['latest']}", state['latest']
+
+
+def conditional_response(request, state, last_modified, render):
+    """
+    Answer 304 if the client's validators still match ``state``, otherwise
+    call ``render()`` and put the validators on its response.
+
+    The ETag covers the user and the full path, so different pages, filters
+    and users never share one. ``last_modified`` should only be passed when
+    the timestamp alone is enough to tell a change, i.e. for a single row.
+    """
+    source = f'{request.user.pk}:{state}:{request.get_full_path()}'
+    etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if not_modified is not None:
+        return not_modified
+    response = render()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET for generic list and retrieve views: idle polls get a
+    304 after one aggregate query, before any row is serialized.
+
+    The validators come from the count and max ``conditional_timestamp_field``
+    of the view's queryset; views that keep a version instead override
+    get_conditional_state().
+    """
+    conditional_timestamp_field = 'updated'
+
+    def get_conditional_state(self, request, lookup=None):
+        # returns (state, last_modified or None)
+        queryset = self.filter_queryset(self.get_queryset())
+        if lookup is None:
+            state, _ = queryset_state(queryset, self.conditional_timestamp_field)
+            return state, None
+        return queryset_state(queryset.filter(**lookup), self.conditional_timestamp_field)
+
+    def list(self, request, *args, **kwargs):
+        state, last_modified = self.get_conditional_state(request)
+        return conditional_response(request, state, last_modified,
+                                    lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        state, last_modified = self.get_conditional_state(request, {self.lookup_field: kwargs[lookup_url_kwarg]})
+        return conditional_response(request, state, last_modified,
+                                    lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+
+
+def conditional_get(get_state):
+    """
+    The same for ``@api_view`` functions; put it below the DRF decorators.
+
+    ``get_state(request, *args, **kwargs)`` returns ``(state, last_modified)``
+    like ConditionalGetMixin.get_conditional_state.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            state, last_modified = get_state(request, *args, **kwargs)
+            return conditional_response(request, state, last_modified, lambda: view(request, *args, **kwargs))
+        return wrapped
+    return decorator
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+DEFAULT_PASSWORD_HASHING_POOL = {
+    'MAX_WORKERS': 4,
+    'QUEUE_LIMIT': 64,
+}
+
+
+class HashingPoolFull(Exception):
+    pass
+
+
+class PasswordHashingPool:
+    """
+    Runs password hashing on a small dedicated thread pool.
+
+    hashlib releases the GIL while it runs PBKDF2, so the event loop keeps
+    serving other requests meanwhile. At most ``max_workers`` hashes run at
+    once and at most ``queue_limit`` more may wait; anything beyond that is
+    refused right away with HashingPoolFull instead of piling up.
+    """
+
+    def __init__(self, max_workers, queue_limit):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(max_workers + queue_limit)
+
+    async def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolFull()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
+
+    async def check_password(self, password, encoded):
+        return await self.run(check_password, password, encoded)
+
+    async def make_password(self, password):
+        return await self.run(make_password, password)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                options = dict(DEFAULT_PASSWORD_HASHING_POOL, **getattr(settings, 'PASSWORD_HASHING_POOL', {}))
+                _pool = PasswordHashingPool(options['MAX_WORKERS'], options['QUEUE_LIMIT'])
+    return _pool
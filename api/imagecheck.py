@@ -0,0 +1,54 @@
+"""
+Validates one image file in a child process:
+
+    python -m api.imagecheck PATH MAX_PIXELS CPU_SECONDS MEMORY_BYTES
+
+Prints the Pillow format name and exits 0 for a usable image, otherwise
+prints the reason and exits 1. It caps its own CPU time and memory before
+opening the file, so a crafted image that makes the decoder misbehave only
+takes this process down. Kept free of Django imports so that it starts fast.
+"""
+import sys
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+from PIL import Image
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+def check(path, max_pixels):
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            if image_format not in ALLOWED_FORMATS:
+                return 1, f'Unsupported image format {image_format}.'
+            width, height = image.size
+            if width * height > max_pixels:
+                return 1, 'Image dimensions are too large.'
+            image.verify()
+        # verify() doesn't decode the pixels; a truncated file fails here
+        with Image.open(path) as image:
+            image.load()
+    except Image.DecompressionBombError:
+        return 1, 'Image dimensions are too large.'
+    except Exception:
+        return 1, 'Invalid image file.'
+    return 0, image_format
+
+
+def limit(cpu_seconds, memory_bytes):
+    if resource is not None:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+
+if __name__ == '__main__':
+    limit(int(sys.argv[3]), int(sys.argv[4]))
+    code, message = check(sys.argv[1], int(sys.argv[2]))
+    print(message)
+    sys.exit(code)
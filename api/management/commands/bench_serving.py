@@ -0,0 +1,63 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = ('Measure static and media serving through the full middleware stack: '
+            'plain, compressed, revalidated (304) and ranged requests.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--static', default='admin/css/base.css',
+                            help='Static file to request, as passed to {% static %}. Run collectstatic first.')
+        parser.add_argument('--media', help='Media file to request, relative to MEDIA_ROOT.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stderr.write('DEBUG is on: WhiteNoise rescans files on every request and skips caching.')
+        client = Client()
+        paths = []
+        try:
+            # the hashed name, which {% static %} only hands out with DEBUG off
+            paths.append(('static', settings.STATIC_URL + staticfiles_storage.stored_name(options['static'])))
+        except ValueError as exc:
+            raise CommandError(f'{exc} (run collectstatic first)')
+        if options['media']:
+            paths.append(('media', settings.MEDIA_URL + options['media']))
+
+        self.stdout.write(f"{'scenario':<24}{'status':>7}{'bytes':>10}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+        for kind, url in paths:
+            first = client.get(url)
+            if first.status_code != 200:
+                raise CommandError(f'{url} answered {first.status_code}')
+            etag = first.get('ETag', '')
+            scenarios = [
+                ('plain', {}),
+                ('gzip', {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+                ('brotli', {'HTTP_ACCEPT_ENCODING': 'br, gzip'}),
+                ('if-none-match', {'HTTP_IF_NONE_MATCH': etag}),
+                ('range 0-1023', {'HTTP_RANGE': 'bytes=0-1023'}),
+            ]
+            for name, headers in scenarios:
+                self.run_scenario(client, f'{kind} {name}', url, headers, options['requests'])
+            self.stdout.write(f"  {url}: Cache-Control: {first.get('Cache-Control', '-')}")
+
+    def run_scenario(self, client, label, url, headers, count):
+        timings = []
+        size = 0
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.get(url, **headers)
+            size = len(b''.join(response.streaming_content) if response.streaming else response.content)
+            response.close()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        self.stdout.write(
+            f'{label:<24}{response.status_code:>7}{size:>10}{count / sum(timings):>10.0f}'
+            f'{statistics.median(timings) * 1000:>9.2f}{timings[int(len(timings) * 0.99) - 1] * 1000:>9.2f}'
+        )
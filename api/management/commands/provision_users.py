@@ -0,0 +1,39 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.provisioning import UserProvisioner, read_user_rows
+
+
+class Command(BaseCommand):
+    help = ('Create users with their token and profile from a CSV or NDJSON file '
+            'with username, password and optional mobile.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row, or NDJSON file.')
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format; guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of users inserted per transaction.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processes hashing passwords; defaults to the CPU count.')
+
+    def handle(self, *args, **options):
+        provisioner = UserProvisioner(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            progress=self.report,
+        )
+        try:
+            provisioner.run(read_user_rows(options['path'], options['format']))
+        except (OSError, UnicodeDecodeError, csv.Error) as exc:
+            raise CommandError(exc)
+        for line, username, error in provisioner.invalid:
+            self.stderr.write(f'Row {line} ({username or "no username"}): {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {provisioner.created} users, skipped {provisioner.skipped} existing or repeated, '
+            f'{len(provisioner.invalid)} invalid.'
+        ))
+
+    def report(self, provisioner):
+        self.stdout.write(f'{provisioner.created} created, {provisioner.skipped} skipped...')
@@ -0,0 +1,123 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# directories of MEDIA_ROOT holding uploads still being written; never served
+PRIVATE_DIRS = ('tmp',)
+# the only types served inline; anything else is a download, so an upload
+# can't run as HTML or script on this origin whatever its name
+INLINE_TYPES = ('image/jpeg', 'image/png', 'image/gif', 'image/webp')
+# file names that are hashes of the content; they never change
+IMMUTABLE_RE = re.compile(r'(^|/)[0-9a-f]{64}\.\w+$')
+
+
+def media_cache_control(name):
+    if IMMUTABLE_RE.search(name):
+        return 'public, max-age=31536000, immutable'
+    return f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single-range ``Range`` header,
+    None to ignore the header, or False when it can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        # multiple ranges or another unit; answering 200 is allowed
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def is_private(full_path):
+    # compare resolved paths, so that '..', '.' and symlinks can't reach
+    # into a private directory through another name
+    full_path = os.path.realpath(full_path)
+    for directory in PRIVATE_DIRS:
+        private = os.path.realpath(default_storage.path(directory))
+        if os.path.commonpath([full_path, private]) == private:
+            return True
+    return False
+
+
+def _read_range(path, start, length, chunk_size=64 * 1024):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve(request, path):
+    """
+    Serve an uploaded file from MEDIA_ROOT with ETag, Last-Modified and
+    single-range support. Content-addressed files are cached as immutable.
+
+    Meant for deployments without a web server in front of MEDIA_ROOT; the
+    file is streamed from disk, never read into memory.
+    """
+    name = path.lstrip('/')
+    if not name:
+        raise Http404()
+    try:
+        full_path = default_storage.path(name)
+        stat = os.stat(full_path)
+    except Exception:
+        raise Http404()
+    if not os.path.isfile(full_path) or is_private(full_path):
+        raise Http404()
+
+    if IMMUTABLE_RE.search(name):
+        etag = quote_etag(os.path.splitext(os.path.basename(name))[0])
+    else:
+        etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type = mimetypes.guess_type(full_path)[0]
+        if content_type not in INLINE_TYPES:
+            content_type = 'application/octet-stream'
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if range_header and request.META.get('HTTP_IF_RANGE', etag) == etag:
+            byte_range = parse_range(range_header, stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        elif byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(_read_range(full_path, start, end - start + 1),
+                                             status=206, content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        if content_type not in INLINE_TYPES:
+            response['Content-Disposition'] = 'attachment'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = media_cache_control(name)
+    return response
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.19 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_pic_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
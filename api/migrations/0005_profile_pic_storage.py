@@ -0,0 +1,19 @@
+# Generated by Django 3.2.19 on 2026-10-18 20:43
+
+import api.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_profile_pic_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_pic',
+            field=models.ImageField(blank=True, null=True, storage=api.uploads.ContentAddressedStorage(), upload_to='profiles/profile_pics'),
+        ),
+    ]
@@ -3,18 +3,33 @@ from django.db import models
 from django.contrib.auth.models import User,Group,Permission
 
 from django.conf import settings
-from django.core.files.storage import FileSystemStorage
+
+from .uploads import profile_pic_storage
 class CustomUser(models.Model):
     user = models.OneToOneField(User,on_delete=models.CASCADE)
     mobile = models.CharField(max_length=20)
-    profile_pic = models.ImageField(upload_to='profiles/profile_pics', blank=True, null=True)
-    def save_profile_pic(self, request):
-        if request.method == 'POST' and request.FILES.get('profile_pic'):
-            profile_pic = request.FILES['profile_pic']
-            fs = FileSystemStorage()
-            filename = fs.save(f"{request.user.username}/{profile_pic.name}", profile_pic)
-            uploaded_file_url = fs.url(filename)
-            # Build the absolute URL of the uploaded image
-            absolute_url = request.build_absolute_uri(uploaded_file_url)
-            return absolute_url
-        
+    # stored under the sha256 of the content, see api.uploads
+    profile_pic = models.ImageField(upload_to='profiles/profile_pics', storage=profile_pic_storage, blank=True, null=True)
+    # resized copies of profile_pic, filled in the background by api.thumbnails
+    profile_pic_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+
+class TokenVersion(models.Model):
+    # Embedded in every signed token issued to the user; bumping it revokes
+    # all of them at once, see api.tokens.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user} v{self.version}"
+
+
+class RefreshSession(models.Model):
+    # One per signed login. Its refresh token carries the id and the number
+    # of uses so far, so each refresh token works once; see api.tokens.
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    uses = models.PositiveIntegerField(default=0)
+    refreshed = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} session {self.pk}"
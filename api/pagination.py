@@ -0,0 +1,158 @@
+import base64
+import datetime
+import heapq
+import itertools
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    # isoformat keeps the full microseconds, DjangoJSONEncoder would cut them
+    # down to milliseconds and break the comparison against the stored value.
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(values):
+    data = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii'))
+    except (TypeError, ValueError):
+        raise NotFound('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise NotFound('Invalid cursor')
+    return values
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the filter selecting rows strictly after ``values`` for ``ordering``.
+
+    ``ordering`` is a tuple like ``('-created', '-id')``. The extra bound on
+    the first field is redundant logically but lets the database seek into
+    the index instead of evaluating the OR for every row.
+    """
+    def after(fields, values):
+        field, value = fields[0], values[0]
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition = Q(**{f'{name}__{lookup}': value})
+        if len(fields) > 1:
+            condition |= Q(**{name: value}) & after(fields[1:], values[1:])
+        return condition
+
+    first = ordering[0].lstrip('-')
+    bound = 'lte' if ordering[0].startswith('-') else 'gte'
+    return Q(**{f'{first}__{bound}': values[0]}) & after(ordering, values)
+
+
+def keyset_position(row, ordering):
+    # works for model instances as well as .values() dicts
+    if isinstance(row, dict):
+        return [row[field.lstrip('-')] for field in ordering]
+    return [getattr(row, field.lstrip('-')) for field in ordering]
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the full ordering tuple.
+
+    Every page is a single indexed range query, so fetching page 1000 costs
+    the same as fetching page 1. The cursor is an opaque base64 token holding
+    the ordering values of the last row of the previous page.
+    """
+    ordering = ('-created', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_position(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        return decode_cursor(cursor, len(self.ordering))
+
+    def _after(self, queryset, position):
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(keyset_filter(self.ordering, position))
+            except ValidationError:
+                raise NotFound('Invalid cursor')
+        return queryset[:self.limit + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return the page after the request cursor.
+
+        ``queryset`` may also be a list of querysets sharing the ordering
+        fields, e.g. the hot and the archived todos. Each one is read with the
+        same bounded range query and the results are merged in order.
+        """
+        self.request = request
+        self.limit = self.get_page_size(request)
+        position = self.get_position(request)
+
+        # Fetch one extra row to know whether there is a next page without
+        # running a COUNT.
+        if isinstance(queryset, (list, tuple)):
+            sources = [list(self._after(source, position)) for source in queryset]
+            merged = heapq.merge(*sources, key=lambda row: keyset_position(row, self.ordering),
+                                 reverse=self.ordering[0].startswith('-'))
+            rows = list(itertools.islice(merged, self.limit + 1))
+        else:
+            rows = list(self._after(queryset, position))
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_position = keyset_position(rows[-1], self.ordering) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class SearchPagination(LimitOffsetPagination):
+    # Ranked results have no stable key to build a cursor on, and nobody
+    # pages deep into search results, so plain limit/offset is used here.
+    default_limit = 50
+    max_limit = 200
@@ -0,0 +1,165 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.authtoken.models import Token
+
+from .bloom import get_username_filter
+from .models import CustomUser
+from .serializers import signup_credentials_error, validate_mobile_number
+
+
+USER_FIELDS = ('username', 'password', 'mobile')
+
+
+def read_user_rows(path, file_format=None):
+    """
+    Yield ``{'line', 'username', 'password', 'mobile', 'error'}`` dicts from a
+    CSV file with a header row, or from an NDJSON file (one object per line).
+
+    ``error`` is None, or why the row couldn't be read: a line that isn't a
+    JSON object, or a field that isn't a string. Such rows come with empty
+    fields and are reported by the provisioner like rows failing row_error.
+    """
+    if file_format is None:
+        file_format = 'csv' if str(path).lower().endswith('.csv') else 'ndjson'
+    with open(path, newline='', encoding='utf-8') as handle:
+        if file_format == 'csv':
+            reader = csv.DictReader(handle)
+            rows = ((reader.line_num, row) for row in reader)
+        else:
+            rows = _ndjson_rows(handle)
+        for line, row in rows:
+            if isinstance(row, str):
+                yield _unreadable_row(line, row)
+                continue
+            values = {field: row.get(field) or '' for field in USER_FIELDS}
+            wrong = [field for field, value in values.items() if not isinstance(value, str)]
+            if wrong:
+                yield _unreadable_row(line, f'{wrong[0]} must be a string.')
+                continue
+            yield {
+                'line': line,
+                'username': values['username'].strip(),
+                'password': values['password'],
+                'mobile': values['mobile'].strip(),
+                'error': None,
+            }
+
+
+def _ndjson_rows(handle):
+    # (line number, the object, or why the line isn't one)
+    for line, text in enumerate(handle, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            yield line, 'Not valid JSON.'
+            continue
+        yield line, row if isinstance(row, dict) else 'Not a JSON object.'
+
+
+def _unreadable_row(line, error):
+    return dict({field: '' for field in USER_FIELDS}, line=line, error=error)
+
+
+def row_error(row):
+    # The same rules signup applies, plus the profile's mobile format.
+    error = signup_credentials_error(row['username'], row['password'])
+    if error is not None:
+        return error['message']
+    if row['mobile']:
+        try:
+            validate_mobile_number(row['mobile'])
+        except serializers.ValidationError as exc:
+            return exc.detail[0]
+    return None
+
+
+def _init_worker():
+    # no-op with fork; a spawned worker has to load the settings first
+    django.setup()
+
+
+class UserProvisioner:
+    """
+    Creates users in batches: passwords are hashed across a process pool and
+    each batch is written with one bulk insert per table (User, Token,
+    CustomUser) inside a single transaction.
+
+    Usernames that already exist, or repeat within the input, are skipped.
+    """
+
+    def __init__(self, batch_size=500, workers=None, progress=None):
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.progress = progress
+        self.created = 0
+        self.skipped = 0
+        self.invalid = []
+        self._seen = set()
+
+    def run(self, rows):
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            batch = []
+            for row in rows:
+                error = row['error'] or row_error(row)
+                if error is not None:
+                    self.invalid.append((row['line'], row['username'], error))
+                    continue
+                if row['username'] in self._seen:
+                    self.skipped += 1
+                    continue
+                self._seen.add(row['username'])
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self._write(batch, pool)
+                    batch = []
+            if batch:
+                self._write(batch, pool)
+        return self.created
+
+    def _write(self, batch, pool):
+        User = get_user_model()
+        existing = set(
+            User.objects.filter(username__in=[row['username'] for row in batch])
+            .values_list('username', flat=True)
+        )
+        batch = [row for row in batch if row['username'] not in existing]
+        self.skipped += len(existing)
+        if batch:
+            chunksize = max(1, len(batch) // (4 * self.workers))
+            hashes = pool.map(make_password, [row['password'] for row in batch], chunksize=chunksize)
+            users = [
+                User(username=row['username'], password=encoded)
+                for row, encoded in zip(batch, hashes)
+            ]
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=self.batch_size)
+                # SQLite can't return the new ids from a bulk insert
+                ids = dict(
+                    User.objects.filter(username__in=[row['username'] for row in batch])
+                    .values_list('username', 'id')
+                )
+                Token.objects.bulk_create(
+                    [Token(key=Token.generate_key(), user_id=ids[row['username']]) for row in batch],
+                    batch_size=self.batch_size,
+                )
+                CustomUser.objects.bulk_create(
+                    [CustomUser(user_id=ids[row['username']], mobile=row['mobile']) for row in batch],
+                    batch_size=self.batch_size,
+                )
+            # bulk_create sends no post_save
+            username_filter = get_username_filter()
+            for row in batch:
+                username_filter.add(row['username'])
+            self.created += len(batch)
+        if self.progress is not None:
+            self.progress(self)
@@ -3,18 +3,15 @@ from rest_framework import serializers
 from main import settings
 from todo.models import Todo
 
-import imghdr
-
 from rest_framework import serializers
+from django.core.files.storage import default_storage
+
 from .models import CustomUser
+from .uploads import validate_image_upload
 
 def validate_image_file(value):
-    # You can use any logic to validate the image file format
-    # For example, use the imghdr module to check the file header
-    file_type = imghdr.what(value)
-    if file_type not in ['jpeg', 'png', 'gif']:
-        raise serializers.ValidationError('Invalid image file format.')
-    return value    
+    # Pillow decodes the file in a separate, resource-limited process
+    return validate_image_upload(value)
 
 def validate_mobile_number(value):
     # You can use any regex pattern to match your desired phone number format
@@ -24,11 +21,59 @@ def validate_mobile_number(value):
         raise serializers.ValidationError('Invalid mobile number format.')
     return value
 
+def password_format_error(password):
+    if not re.match(r'^\d{6}$', password or ''):
+        # رسالة خطأ عندما تحتوي كلمة المرور على أكثر أو أقل من 6 أرقام
+        # Error message when the password does not contain exactly 6 digits
+        return {'error': 'Invalid password', 'message': 'Password must contain exactly 6 digits.'}
+    return None
+
+def signup_credentials_error(username, password):
+    # Shared by signup and its async variant; returns the error payload for
+    # the first failed rule, or None.
+    if not username or not password:
+        # رسالة خطأ عندما يكون اسم المستخدم أو كلمة المرور غير موجودة
+        # Error message when either username or password is missing
+        return {'error': 'Username and password are required', 'message': 'Please provide a valid username and password.'}
+    if len(username) < 3:
+        # رسالة خطأ عندما يكون اسم المستخدم أقل من 3 أحرف
+        # Error message when the username is less than 3 characters
+        return {'error': 'Invalid username', 'message': 'Username must be at least 3 characters long.'}
+    error = password_format_error(password)
+    if error is not None:
+        return error
+    if not re.match(r'^\w+$', username):
+        # رسالة خطأ عندما يحتوي اسم المستخدم على حروف وأرقام وشرطات سفلية فقط
+        # Error message when the username contains characters other than alphanumeric and underscores
+        return {'error': 'Invalid username', 'message': 'Username can only contain alphanumeric characters and underscores.'}
+    return None
+
 
 class CustomUserSerializer(serializers.ModelSerializer):
+    # a plain FileField so Pillow never parses the upload in this process,
+    # validate_profile_pic checks it in a child process instead
+    profile_pic = serializers.FileField(required=False, allow_null=True)
+    profile_pic_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = CustomUser
-        fields = ['mobile', 'profile_pic']
+        fields = ['mobile', 'profile_pic', 'profile_pic_variants']
+
+    def get_profile_pic_variants(self, obj):
+        # {"64": {"webp": url, "jpeg": url}, ...}, empty until the resize ran
+        variants = obj.profile_pic_variants or {}
+        if not obj.profile_pic or variants.get('source') != obj.profile_pic.name:
+            return {}
+        request = self.context.get('request')
+        urls = {}
+        for size, files in variants.items():
+            if size == 'source':
+                continue
+            urls[size] = {}
+            for fmt, name in files.items():
+                url = default_storage.url(name)
+                urls[size][fmt] = request.build_absolute_uri(url) if request is not None else url
+        return urls
 
     def validate_mobile(self, value):
         # validate mobile number format
@@ -42,9 +87,10 @@ class CustomUserSerializer(serializers.ModelSerializer):
 class TodoSerializer(serializers.ModelSerializer):
     created = serializers.ReadOnlyField()
     completed = serializers.ReadOnlyField()
+    updated = serializers.ReadOnlyField()
     class Meta:
         model = Todo
-        fields = ['id','title','memo','created','completed']
+        fields = ['id','title','memo','created','completed','updated']
 
 
 class TodoToggleCompleteSerializer(serializers.ModelSerializer):
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_token_cache
+from .bloom import get_username_filter
+from .models import CustomUser
+from .thumbnails import schedule_profile_pic_variants
+from .tokens import bump_token_version
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    get_token_cache().delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_tokens(sender, instance, **kwargs):
+    # Any change may matter to the cached copy, deactivation above all.
+    get_token_cache().delete_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def revoke_signed_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # signed tokens carry is_active=True, so they must die with the account
+    if not created and not instance.is_active and (update_fields is None or 'is_active' in update_fields):
+        bump_token_version(instance)
+
+
+@receiver(post_save, sender=User)
+def remember_username(sender, instance, created, **kwargs):
+    if created:
+        get_username_filter().add(instance.get_username())
+
+
+@receiver(post_save, sender=CustomUser)
+def resize_profile_pic(sender, instance, **kwargs):
+    if instance.profile_pic and instance.profile_pic_variants.get('source') != instance.profile_pic.name:
+        schedule_profile_pic_variants(instance)
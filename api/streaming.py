@@ -0,0 +1,55 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .pagination import keyset_filter, keyset_position
+
+
+def iterate_keyset(queryset, ordering, chunk_size=1000):
+    """
+    Yield ``queryset`` in lists of at most ``chunk_size`` rows.
+
+    Each chunk is its own indexed range query starting after the last row of
+    the previous one, so no cursor stays open between chunks and memory use
+    does not grow with the size of the result.
+    """
+    position = None
+    while True:
+        chunk = queryset.order_by(*ordering)
+        if position is not None:
+            chunk = chunk.filter(keyset_filter(ordering, position))
+        rows = list(chunk[:chunk_size])
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        position = keyset_position(rows[-1], ordering)
+
+
+def ndjson_stream(chunks):
+    for rows in chunks:
+        yield ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows)
+
+
+def json_stream(chunks):
+    # one JSON array, written as the chunks arrive
+    yield '['
+    separator = ''
+    for rows in chunks:
+        yield separator + ','.join(json.dumps(row, cls=DjangoJSONEncoder) for row in rows)
+        separator = ','
+    yield ']'
+
+
+class _Echo:
+    # csv.writer only needs an object with write(), hand the line straight back
+    def write(self, value):
+        return value
+
+
+def csv_stream(chunks, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for rows in chunks:
+        yield ''.join(writer.writerow([row[field] for field in fields]) for row in rows)
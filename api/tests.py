@@ -1,3 +1,538 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import authentication, throttling
+
+from api.authentication import SharedTokenCache
+from api.bloom import DEFAULT_USERNAME_FILTER, UsernameFilter
+from api.models import CustomUser
+from api.pagination import encode_cursor
+from api.provisioning import read_user_rows
+from api.throttling import CacheSlidingWindow, LoginThrottle
+from api.tokens import bump_token_version, login_tokens
+from todo.models import Todo
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [todo['id'] for todo in response.json()['results']]
+            url = response.json()['next']
+        return ids
+
+    def test_pages_follow_created_then_id(self):
+        todos = [Todo.objects.create(user=self.user, title=f'todo {i}') for i in range(7)]
+        # ties on created are broken by id
+        same = timezone.now()
+        Todo.objects.filter(pk__in=[todo.pk for todo in todos[2:5]]).update(created=same)
+        Todo.objects.create(user=User.objects.create_user('bob'), title='not mine')
+        expected = list(Todo.objects.filter(user=self.user).order_by('-created', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/todos/?page_size=2'), expected)
+        self.assertEqual(self.walk('/todos/?page_size=3'), expected)
+
+    def test_last_page_has_no_next_link(self):
+        Todo.objects.create(user=self.user, title='only')
+        self.assertIsNone(self.client.get('/todos/').json()['next'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('not base64!', encode_cursor([1]), encode_cursor(['not a date', 1])):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get('/todos/', {'cursor': cursor}).status_code, 404)
+
+
+class TodoBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.todo = Todo.objects.create(user=self.user, title='milk')
+
+    def batch(self, *operations):
+        return self.client.post('/todos/batch/', {'operations': list(operations)}, format='json')
+
+    def test_applies_every_operation(self):
+        doomed = Todo.objects.create(user=self.user, title='doomed')
+        response = self.batch(
+            {'op': 'create', 'data': {'title': 'bread'}},
+            {'op': 'update', 'id': self.todo.pk, 'data': {'title': 'oat milk'}},
+            {'op': 'toggle', 'id': self.todo.pk},
+            {'op': 'delete', 'id': doomed.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()['results']], [201, 200, 200, 204])
+        self.assertIsNotNone(response.json()['results'][0]['todo']['id'])
+        self.todo.refresh_from_db()
+        self.assertEqual((self.todo.title, self.todo.completed), ('oat milk', True))
+        self.assertEqual(sorted(Todo.objects.values_list('title', flat=True)), ['bread', 'oat milk'])
+
+    def test_one_invalid_operation_rolls_back_the_batch(self):
+        response = self.batch(
+            {'op': 'create', 'data': {'title': 'bread'}},
+            {'op': 'update', 'id': self.todo.pk, 'data': {'title': 'oat milk'}},
+            {'op': 'update', 'id': self.todo.pk, 'data': {'title': 'x' * 101}},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['applied'])
+        self.assertEqual([result['status'] for result in response.json()['results']], [424, 424, 400])
+        self.assertEqual(list(Todo.objects.values_list('title', flat=True)), ['milk'])
+
+    def test_other_users_todo_is_not_found(self):
+        theirs = Todo.objects.create(user=User.objects.create_user('bob'), title='not mine')
+        response = self.batch({'op': 'delete', 'id': theirs.pk})
+        self.assertEqual(response.json()['results'][0]['status'], 404)
+        self.assertTrue(Todo.objects.filter(pk=theirs.pk).exists())
+
+    def test_deleted_todo_cannot_be_updated_later_in_the_batch(self):
+        response = self.batch(
+            {'op': 'delete', 'id': self.todo.pk},
+            {'op': 'toggle', 'id': self.todo.pk},
+        )
+        self.assertEqual([result['status'] for result in response.json()['results']], [424, 404])
+        self.assertTrue(Todo.objects.filter(pk=self.todo.pk).exists())
+
+    def test_unknown_operation(self):
+        response = self.batch({'op': 'archive', 'id': self.todo.pk})
+        self.assertEqual(response.json()['results'][0]['status'], 400)
+
+
+class TodoSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, cursor=None, page_size=None):
+        params = {}
+        if cursor:
+            params['since'] = cursor
+        if page_size:
+            params['page_size'] = page_size
+        response = self.client.get('/todos/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_sync_is_paginated(self):
+        todos = [Todo.objects.create(user=self.user, title=f'todo {i}') for i in range(5)]
+        seen = []
+        cursor = None
+        while True:
+            page = self.sync(cursor, page_size=2)
+            self.assertLessEqual(len(page['changed']), 2)
+            seen += [todo['id'] for todo in page['changed']]
+            cursor = page['cursor']
+            if not page['more']:
+                break
+        self.assertEqual(seen, [todo.pk for todo in todos])
+        self.assertEqual(self.sync(cursor), {'changed': [], 'deleted': [], 'cursor': cursor, 'more': False})
+
+    def test_changes_since_cursor(self):
+        kept = Todo.objects.create(user=self.user, title='kept')
+        gone = Todo.objects.create(user=self.user, title='gone')
+        cursor = self.sync()['cursor']
+
+        kept.title = 'renamed'
+        kept.save()
+        gone_id = gone.pk
+        gone.delete()
+        Todo.objects.create(user=User.objects.create_user('bob'), title='not mine')
+
+        page = self.sync(cursor)
+        self.assertEqual([todo['title'] for todo in page['changed']], ['renamed'])
+        self.assertEqual(page['deleted'], [gone_id])
+
+    def test_changes_are_numbered_in_write_order(self):
+        first = Todo.objects.create(user=self.user, title='first')
+        second = Todo.objects.create(user=self.user, title='second')
+        first.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertGreater(first.change_seq, second.change_seq)
+
+    def test_timestamp_cursor_is_rejected(self):
+        response = self.client.get('/todos/sync/', {'since': encode_cursor(['2026-01-01T00:00:00+00:00'])})
+        self.assertEqual(response.status_code, 404)
+
+
+class MediaTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(MEDIA_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        os.makedirs(os.path.join(self.root, 'profiles'))
+        os.makedirs(os.path.join(self.root, 'tmp'))
+        with open(os.path.join(self.root, 'profiles', 'a.txt'), 'wb') as handle:
+            handle.write(b'0123456789')
+        with open(os.path.join(self.root, 'tmp', 'upload.txt'), 'wb') as handle:
+            handle.write(b'secret')
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.client.get('/media/profiles/a.txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range(self):
+        response = self.client.get('/media/profiles/a.txt', HTTP_RANGE='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.content(response), b'234')
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+
+    def test_suffix_range(self):
+        response = self.client.get('/media/profiles/a.txt', HTTP_RANGE='bytes=-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.content(response), b'789')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get('/media/profiles/a.txt', HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.client.get('/media/profiles/a.txt', HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        etag = self.client.get('/media/profiles/a.txt')['ETag']
+        response = self.client.get('/media/profiles/a.txt', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_only_images_are_served_inline(self):
+        with open(os.path.join(self.root, 'profiles', 'pic.png'), 'wb') as handle:
+            handle.write(b'not checked here')
+        response = self.client.get('/media/profiles/pic.png')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertFalse(response.get('Content-Disposition', '').startswith('attachment'))
+        for name in ('a.txt', 'page.html', 'icon.svg', 'app.js'):
+            with open(os.path.join(self.root, 'profiles', name), 'wb') as handle:
+                handle.write(b'<script>alert(1)</script>')
+            for headers in ({}, {'HTTP_RANGE': 'bytes=0-3'}):
+                with self.subTest(name=name, **headers):
+                    response = self.client.get(f'/media/profiles/{name}', **headers)
+                    self.assertEqual(response['Content-Type'], 'application/octet-stream')
+                    self.assertEqual(response['Content-Disposition'], 'attachment')
+
+    def test_private_uploads_are_not_served(self):
+        for path in ('/media/tmp/upload.txt', '/media/./tmp/upload.txt', '/media/profiles/../tmp/upload.txt',
+                     '/media//tmp/upload.txt', '/media/tmp'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_private_uploads_are_not_served_through_a_symlink(self):
+        os.symlink(os.path.join(self.root, 'tmp'), os.path.join(self.root, 'profiles', 'link'))
+        self.assertEqual(self.client.get('/media/profiles/link/upload.txt').status_code, 404)
+
+
+class ReadUserRowsTests(TestCase):
+    def rows(self, content, suffix):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return [(row['line'], row['username'], row['error']) for row in read_user_rows(path)]
+
+    def test_ndjson(self):
+        content = ('{"username": " alice ", "password": "123456"}\n'
+                   '\n'
+                   '{broken\n'
+                   '["bob"]\n'
+                   '{"username": 7, "password": "123456"}\n'
+                   '{"username": "carol", "password": "123456", "mobile": null}\n')
+        self.assertEqual(self.rows(content, '.ndjson'), [
+            (1, 'alice', None),
+            (3, '', 'Not valid JSON.'),
+            (4, '', 'Not a JSON object.'),
+            (5, '', 'username must be a string.'),
+            (6, 'carol', None),
+        ])
+
+    def test_csv_lines_count_the_header_and_quoted_newlines(self):
+        content = 'username,password,mobile\nalice,123456,\n"bo\nb",123456,\ncarol,123456,\n'
+        self.assertEqual(self.rows(content, '.csv'), [(2, 'alice', None), (4, 'bo\nb', None), (5, 'carol', None)])
+
+
+class UsernameFilterTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('alice')
+        self.filter = UsernameFilter(dict(DEFAULT_USERNAME_FILTER))
+
+    def test_lookups_after_a_rebuild(self):
+        self.filter.rebuild()
+        self.assertTrue(self.filter.is_taken('alice'))
+        self.assertFalse(self.filter.is_taken('bob'))
+        self.assertEqual((self.filter.lookups, self.filter.queries), (2, 1))
+
+    def test_names_added_during_a_rebuild_are_kept(self):
+        build = self.filter._build
+
+        def build_while_bob_signs_up():
+            bloom = build()
+            User.objects.create_user('bob')
+            # what api.signals does for the process's filter
+            self.filter.add('bob')
+            return bloom
+
+        self.filter._build = build_while_bob_signs_up
+        self.filter.rebuild()
+        self.assertTrue(self.filter.is_taken('bob'))
+
+
+@override_settings(AUTH_TOKEN_MODE='signed')
+class SignedTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret')
+        self.tokens = login_tokens(self.user)
+
+    def get_todos(self, token):
+        return self.client.get('/todos/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def refresh(self, token):
+        return self.client.post('/token/refresh/', {'refresh': token}, content_type='application/json')
+
+    def test_access_token(self):
+        self.assertEqual(self.get_todos(self.tokens['token']).status_code, 200)
+        self.assertEqual(self.get_todos(self.tokens['token'][:-1] + 'x').status_code, 401)
+        self.assertEqual(self.get_todos(self.tokens['refresh']).status_code, 401)
+
+    @override_settings(SIGNED_TOKEN_ACCESS_LIFETIME=-1)
+    def test_expired_access_token(self):
+        self.assertEqual(self.get_todos(self.tokens['token']).status_code, 401)
+
+    def test_refresh_token_works_once(self):
+        response = self.refresh(self.tokens['refresh'])
+        self.assertEqual(response.status_code, 200)
+        refreshed = response.json()
+        self.assertEqual(self.get_todos(refreshed['token']).status_code, 200)
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+        # the reuse ended the session, so the thief's or the owner's copy
+        # of the latest refresh token is dead too
+        self.assertEqual(self.refresh(refreshed['refresh']).status_code, 401)
+
+    def test_refresh_chain(self):
+        refresh = self.tokens['refresh']
+        for _ in range(3):
+            response = self.refresh(refresh)
+            self.assertEqual(response.status_code, 200)
+            refresh = response.json()['refresh']
+
+    def test_sessions_are_separate(self):
+        other = login_tokens(self.user)
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 200)
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+        self.assertEqual(self.refresh(other['refresh']).status_code, 200)
+
+    def test_revocation(self):
+        bump_token_version(self.user)
+        self.assertEqual(self.get_todos(self.tokens['token']).status_code, 401)
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+
+
+class ProfilePicUploadTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(MEDIA_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user('alice', password='secret')
+        CustomUser.objects.create(user=self.user, mobile='')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def png(self, name):
+        info = PngInfo()
+        info.add_text('Comment', '<script>alert(1)</script>')
+        buffer = io.BytesIO()
+        Image.new('RGB', (4, 4), 'red').save(buffer, 'PNG', pnginfo=info)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='text/html')
+
+    def upload(self, name):
+        response = self.client.put('/users/', {'profile_pic': self.png(name)}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return CustomUser.objects.get(user=self.user).profile_pic.name
+
+    def test_extension_comes_from_the_detected_format(self):
+        name = self.upload('evil.html')
+        self.assertTrue(name.startswith('profiles/profile_pics/'))
+        self.assertTrue(name.endswith('.png'))
+
+    def test_same_content_is_stored_once_whatever_its_name(self):
+        self.assertEqual(self.upload('a.jpg'), self.upload('b.jpeg'))
+
+    def test_non_image_is_rejected(self):
+        upload = SimpleUploadedFile('pic.png', b'<script>alert(1)</script>', content_type='image/png')
+        response = self.client.put('/users/', {'profile_pic': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+
+class TokenCacheTests(TestCase):
+    backend = 'local'
+
+    def setUp(self):
+        self.use_token_cache()
+        self.user = User.objects.create_user('alice', password='123456')
+        self.token = Token.objects.create(user=self.user)
+
+    def use_token_cache(self):
+        settings_override = override_settings(TOKEN_AUTH_CACHE={'BACKEND': self.backend, 'TIMEOUT': 300})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        authentication._token_cache = None
+        self.addCleanup(setattr, authentication, '_token_cache', None)
+
+    def get_todos(self):
+        return self.client.get('/todos/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def warm(self):
+        self.assertEqual(self.get_todos().status_code, 200)
+        self.assertEqual(authentication.get_token_cache().get(self.token.key), self.user)
+
+    def test_password_change_revokes_a_cached_token(self):
+        self.warm()
+        response = self.client.post('/change-password/', {
+            'old_password': '123456', 'new_password': '654321', 'confirm_password': '654321',
+        }, HTTP_AUTHORIZATION=f'Token {self.token.key}', content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_todos().status_code, 401)
+
+    def test_deactivation_revokes_a_cached_token(self):
+        self.warm()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_todos().status_code, 401)
+
+
+class SharedTokenCacheTests(TokenCacheTests):
+    backend = 'shared'
+
+    def use_token_cache(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': root},
+        }, TOKEN_AUTH_CACHE={'BACKEND': 'shared', 'CACHE_ALIAS': 'shared', 'TIMEOUT': 300})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        authentication._token_cache = None
+        self.addCleanup(setattr, authentication, '_token_cache', None)
+
+    def test_revocation_reaches_other_workers(self):
+        self.warm()
+        this_worker = authentication._token_cache
+        authentication._token_cache = SharedTokenCache('shared', 300)
+        self.token.delete()
+        authentication._token_cache = this_worker
+        self.assertEqual(self.get_todos().status_code, 401)
+
+    def test_per_process_cache_is_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            SharedTokenCache('default', 300)
+
+
+class LoginThrottleTests(TestCase):
+    options = {'BACKEND': 'memory', 'USERNAME_RATE': (3, 60), 'IP_RATE': (5, 60), 'NUM_PROXIES': None}
+
+    def setUp(self):
+        settings_override = override_settings(LOGIN_THROTTLE=self.options)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        throttling._throttle = None
+        self.addCleanup(setattr, throttling, '_throttle', None)
+        User.objects.create_user('alice', password='123456')
+
+    def login(self, username, password='wrong', **extra):
+        extra.setdefault('REMOTE_ADDR', '10.0.0.1')
+        return self.client.post('/login/', {'username': username, 'password': password},
+                                content_type='application/json', **extra)
+
+    def assertThrottled(self, response):
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_username_limit(self):
+        for _ in range(3):
+            self.assertEqual(self.login('alice').status_code, 400)
+        self.assertThrottled(self.login('alice', '123456'))
+        self.assertThrottled(self.login('ALICE', REMOTE_ADDR='10.0.0.2'))
+        self.assertEqual(self.login('bob').status_code, 400)
+
+    def test_ip_limit(self):
+        for index in range(5):
+            self.assertEqual(self.login(f'user{index}').status_code, 400)
+        self.assertThrottled(self.login('alice', '123456'))
+        self.assertEqual(self.login('alice', '123456', REMOTE_ADDR='10.0.0.2').status_code, 201)
+
+    def test_throttled_login_touches_no_user(self):
+        for _ in range(3):
+            self.login('alice')
+        with mock.patch.object(User, 'check_password') as check_password, self.assertNumQueries(0):
+            self.assertThrottled(self.login('alice', '123456'))
+        check_password.assert_not_called()
+
+    @override_settings(LOGIN_THROTTLE=dict(options, NUM_PROXIES=1))
+    def test_spoofed_forwarded_for_does_not_evade_the_limit(self):
+        throttling._throttle = None
+        # the proxy appends the address it saw; the client controls the rest
+        for index in range(5):
+            self.login(f'user{index}', HTTP_X_FORWARDED_FOR=f'1.2.3.{index}, 203.0.113.9')
+        self.assertThrottled(self.login('bob', HTTP_X_FORWARDED_FOR='9.9.9.9, 203.0.113.9'))
+        # clients behind other addresses of the same proxy aren't affected
+        self.assertEqual(self.login('bob', HTTP_X_FORWARDED_FOR='203.0.113.10').status_code, 400)
+
+    def test_client_ip(self):
+        factory = RequestFactory()
+        cases = [
+            (None, '1.1.1.1, 2.2.2.2', '10.0.0.1'),
+            (0, '1.1.1.1, 2.2.2.2', '10.0.0.1'),
+            (1, '1.1.1.1, 2.2.2.2', '2.2.2.2'),
+            (2, '1.1.1.1, 2.2.2.2', '1.1.1.1'),
+            (3, '1.1.1.1, 2.2.2.2', '1.1.1.1'),
+            (1, None, '10.0.0.1'),
+        ]
+        for num_proxies, forwarded, expected in cases:
+            with self.subTest(num_proxies=num_proxies, forwarded=forwarded):
+                throttle = LoginThrottle(dict(throttling.DEFAULT_LOGIN_THROTTLE, NUM_PROXIES=num_proxies))
+                extra = {'REMOTE_ADDR': '10.0.0.1'}
+                if forwarded:
+                    extra['HTTP_X_FORWARDED_FOR'] = forwarded
+                self.assertEqual(throttle.client_ip(factory.post('/login/', **extra)), expected)
+
+    def test_cache_backend(self):
+        cache.clear()
+        window = CacheSlidingWindow('default')
+        # a long window, so that the test doesn't straddle two buckets
+        length = 10 ** 6
+        self.assertEqual([window.hit('login:ip:x', 2, length) for _ in range(2)], [0, 0])
+        self.assertGreater(window.hit('login:ip:x', 2, length), 0)
+        # rejected attempts don't count, the key stays at its limit
+        self.assertEqual(cache.get(f'throttle:login:ip:x:{int(time.time() // length)}'), 2)
+        self.assertEqual(window.hit('login:ip:y', 2, length), 0)
@@ -0,0 +1,153 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_LOGIN_THROTTLE = {
+    'BACKEND': 'memory',
+    'CACHE_ALIAS': 'default',
+    'USERNAME_RATE': (5, 60),
+    'IP_RATE': (30, 60),
+    'NUM_PROXIES': None,
+    'MAX_KEYS': 100000,
+}
+
+
+class MemorySlidingWindow:
+    """
+    Exact sliding-window log kept in this process.
+
+    Holds one deque of attempt times per key, least recently used keys are
+    dropped once there are more than ``max_keys`` of them.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._log = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        """Record an attempt; return 0 if allowed, else seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._log.get(key)
+            if attempts is None:
+                attempts = self._log[key] = deque()
+            self._log.move_to_end(key)
+            while attempts and attempts[0] <= now - window:
+                attempts.popleft()
+            if len(attempts) >= limit:
+                return max(1, math.ceil(attempts[0] + window - now))
+            attempts.append(now)
+            while len(self._log) > self.max_keys:
+                self._log.popitem(last=False)
+            return 0
+
+
+class CacheSlidingWindow:
+    """
+    Sliding-window counter in a Django cache shared by all workers.
+
+    Uses the usual two fixed buckets, weighting the previous one by how much
+    of it still overlaps the window, which is close enough for throttling
+    and costs two cache round trips.
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        bucket = int(now // window)
+        current = f'throttle:{key}:{bucket}'
+        self.cache.add(current, 0, window * 2)
+        count = self.cache.incr(current)
+        previous = self.cache.get(f'throttle:{key}:{bucket - 1}', 0)
+        overlap = 1 - (now - bucket * window) / window
+        if previous * overlap + count > limit:
+            # rejected attempts don't count against the window
+            self.cache.decr(current)
+            return max(1, math.ceil((bucket + 1) * window - now))
+        return 0
+
+
+class LoginThrottle:
+    """
+    Per-IP and per-username attempt limits for the auth endpoints.
+
+    Meant to run before any user lookup or password hashing, so a rejected
+    request costs nothing but the check itself.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        if options['BACKEND'] == 'cache':
+            self.backend = CacheSlidingWindow(options['CACHE_ALIAS'])
+        else:
+            self.backend = MemorySlidingWindow(options['MAX_KEYS'])
+        self._lock = threading.Lock()
+        self.counters = {'allowed': 0, 'rejected_ip': 0, 'rejected_username': 0}
+
+    def client_ip(self, request):
+        # Same rule as DRF's throttles: behind N proxies the client is the
+        # Nth address from the right in X-Forwarded-For.
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        num_proxies = self.options['NUM_PROXIES']
+        if num_proxies is not None and forwarded:
+            addresses = [address.strip() for address in forwarded.split(',')]
+            if num_proxies > 0:
+                return addresses[-min(num_proxies, len(addresses))]
+        return request.META.get('REMOTE_ADDR', '')
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def check(self, request, scope, username=None):
+        """
+        Record an attempt for ``scope`` ('login', 'signup', ...).
+
+        Returns 0 when the request may go on, otherwise the number of seconds
+        the client should wait.
+        """
+        limit, window = self.options['IP_RATE']
+        wait = self.backend.hit(f'{scope}:ip:{self.client_ip(request)}', limit, window)
+        if wait:
+            self._count('rejected_ip')
+            return wait
+        if username:
+            limit, window = self.options['USERNAME_RATE']
+            wait = self.backend.hit(f'{scope}:user:{str(username).lower()}', limit, window)
+            if wait:
+                self._count('rejected_username')
+                return wait
+        self._count('allowed')
+        return 0
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters['backend'] = self.options['BACKEND']
+        counters['ip_rate'] = list(self.options['IP_RATE'])
+        counters['username_rate'] = list(self.options['USERNAME_RATE'])
+        return counters
+
+
+_throttle = None
+_throttle_lock = threading.Lock()
+
+
+def get_login_throttle():
+    global _throttle
+    if _throttle is None:
+        with _throttle_lock:
+            if _throttle is None:
+                _throttle = LoginThrottle(dict(DEFAULT_LOGIN_THROTTLE, **getattr(settings, 'LOGIN_THROTTLE', {})))
+    return _throttle
+
+
+def throttled_payload(wait):
+    return {'error': 'Too many attempts', 'message': f'Too many attempts, please try again in {wait} seconds.'}
@@ -0,0 +1,104 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_PIC_THUMBNAILS = {
+    'SIZES': (64, 256, 1024),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+    'MAX_WORKERS': 2,
+}
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def thumbnail_options():
+    return dict(DEFAULT_PROFILE_PIC_THUMBNAILS, **getattr(settings, 'PROFILE_PIC_THUMBNAILS', {}))
+
+
+def render_variants(source, name, options, storage=default_storage):
+    """
+    Resize the image in the ``source`` file into every size and format.
+
+    Returns ``{'source': name, '<size>': {'<format>': stored name}}``. Images
+    are never upscaled, a size larger than the original is just re-encoded.
+    """
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        stem = os.path.splitext(os.path.basename(name))[0]
+        variants = {'source': name}
+        # largest first, each step resizes the previous result
+        for size in sorted(options['SIZES'], reverse=True):
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            variants[str(size)] = {}
+            for fmt in options['FORMATS']:
+                buffer = io.BytesIO()
+                image.save(buffer, PIL_FORMATS[fmt], quality=options['QUALITY'])
+                path = f'profiles/variants/{stem}-{size}.{EXTENSIONS[fmt]}'
+                variants[str(size)][fmt] = storage.save(path, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def build_profile_pic_variants(custom_user_id, name):
+    """
+    Worker entry point: render the variants of ``name`` and store them on the
+    CustomUser, unless its picture was replaced meanwhile.
+    """
+    close_old_connections()
+    try:
+        with CustomUser._meta.get_field('profile_pic').storage.open(name) as source:
+            variants = render_variants(source, name, thumbnail_options())
+        profile = CustomUser.objects.filter(pk=custom_user_id, profile_pic=name)
+        previous = profile.values_list('profile_pic_variants', flat=True).first()
+        if profile.update(profile_pic_variants=variants):
+            if previous and previous.get('source') != name:
+                delete_variants(previous)
+        else:
+            delete_variants(variants)
+    except Exception:
+        logger.exception('Could not build the variants of profile picture %s', name)
+    finally:
+        close_old_connections()
+
+
+def delete_variants(variants):
+    for size, files in (variants or {}).items():
+        if size != 'source':
+            for name in files.values():
+                default_storage.delete(name)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_thumbnail_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=thumbnail_options()['MAX_WORKERS'], thread_name_prefix='profile-thumbnails'
+                )
+    return _executor
+
+
+def schedule_profile_pic_variants(custom_user):
+    # Runs once the upload is committed, so the worker sees the new picture.
+    name = custom_user.profile_pic.name
+    transaction.on_commit(lambda: get_thumbnail_executor().submit(build_profile_pic_variants, custom_user.pk, name))
@@ -0,0 +1,120 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .models import RefreshSession, TokenVersion
+
+ACCESS_SALT = 'api.tokens.access'
+REFRESH_SALT = 'api.tokens.refresh'
+
+
+def signed_tokens_enabled():
+    return getattr(settings, 'AUTH_TOKEN_MODE', 'db') == 'signed'
+
+
+def access_lifetime():
+    return getattr(settings, 'SIGNED_TOKEN_ACCESS_LIFETIME', 15 * 60)
+
+
+def refresh_lifetime():
+    return getattr(settings, 'SIGNED_TOKEN_REFRESH_LIFETIME', 14 * 24 * 60 * 60)
+
+
+def _version_key(user_id):
+    return f'token-version:{user_id}'
+
+
+def get_token_version(user_id):
+    # Read on every signed request, so it is served from the cache and the
+    # database is only hit after the entry expired.
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = (
+            TokenVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first() or 0
+        )
+        cache.set(_version_key(user_id), version, getattr(settings, 'SIGNED_TOKEN_VERSION_CACHE_TIMEOUT', 60))
+    return version
+
+
+def bump_token_version(user):
+    """Revoke every signed token issued to ``user`` so far."""
+    RefreshSession.objects.filter(user_id=user.pk).delete()
+    TokenVersion.objects.get_or_create(user_id=user.pk)
+    TokenVersion.objects.filter(user_id=user.pk).update(version=F('version') + 1)
+    version = TokenVersion.objects.filter(user_id=user.pk).values_list('version', flat=True).get()
+    cache.set(_version_key(user.pk), version, getattr(settings, 'SIGNED_TOKEN_VERSION_CACHE_TIMEOUT', 60))
+    return version
+
+
+def start_refresh_session(user):
+    # drop the user's sessions whose refresh token expired unused
+    cutoff = timezone.now() - datetime.timedelta(seconds=refresh_lifetime())
+    RefreshSession.objects.filter(user_id=user.pk, refreshed__lt=cutoff).delete()
+    return RefreshSession.objects.create(user_id=user.pk)
+
+
+def use_refresh_session(claims):
+    """
+    Spend the refresh token ``claims``: return its session, moved on to the
+    next token, or None if the token was already spent or its session ended.
+
+    A spent token coming back means two clients hold the session, one of
+    them with a stolen token, so the session is ended for both.
+    """
+    if 'sid' not in claims:
+        return None
+    used = RefreshSession.objects.filter(pk=claims['sid'], user_id=claims['uid'], uses=claims['n']).update(
+        uses=F('uses') + 1, refreshed=timezone.now())
+    if not used:
+        RefreshSession.objects.filter(pk=claims['sid'], user_id=claims['uid']).delete()
+        return None
+    return RefreshSession(pk=claims['sid'], user_id=claims['uid'], uses=claims['n'] + 1)
+
+
+def issue_signed_tokens(user, version=None, session=None):
+    # a new refresh session unless ``session`` is being refreshed
+    if version is None:
+        version = get_token_version(user.pk)
+    if session is None:
+        session = start_refresh_session(user)
+    claims = {'uid': user.pk, 'usr': user.get_username(), 'v': version}
+    return {
+        'token': signing.dumps(claims, salt=ACCESS_SALT, compress=True),
+        'refresh': signing.dumps(dict(claims, sid=session.pk, n=session.uses), salt=REFRESH_SALT, compress=True),
+        'expires_in': access_lifetime(),
+    }
+
+
+def read_access_token(token):
+    # raises signing.BadSignature (or its SignatureExpired subclass)
+    return signing.loads(token, salt=ACCESS_SALT, max_age=access_lifetime())
+
+
+def read_refresh_token(token):
+    return signing.loads(token, salt=REFRESH_SALT, max_age=refresh_lifetime())
+
+
+def login_tokens(user):
+    # What login and signup hand back, depending on AUTH_TOKEN_MODE.
+    if signed_tokens_enabled():
+        return issue_signed_tokens(user)
+    token, _ = Token.objects.get_or_create(user=user)
+    return {'token': str(token)}
+
+
+def user_from_claims(claims):
+    """
+    Build the request user from token claims without a query.
+
+    Every field other than id, username and is_active is deferred and loaded
+    on first access, so views that only filter by user never touch the
+    user table.
+    """
+    User = get_user_model()
+    return User.from_db('default', ['id', User.USERNAME_FIELD, 'is_active'], [claims['uid'], claims['usr'], True])
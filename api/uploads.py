@@ -0,0 +1,209 @@
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils.deconstruct import deconstructible
+from rest_framework import exceptions, serializers
+
+DEFAULT_PROFILE_PIC_UPLOAD = {
+    'MAX_BYTES': 5 * 1024 * 1024,
+    'MAX_PIXELS': 40000000,
+    'CHECK_TIMEOUT': 5,
+    'CHECK_MEMORY': 512 * 1024 * 1024,
+    'MAX_CHECKS': 4,
+}
+
+
+# stored files are named after the format the image decoded as, never after
+# the client's file name
+IMAGE_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+
+
+def upload_options():
+    return dict(DEFAULT_PROFILE_PIC_UPLOAD, **getattr(settings, 'PROFILE_PIC_UPLOAD', {}))
+
+
+class UploadTooLarge(exceptions.APIException):
+    status_code = 413
+    default_detail = 'The uploaded file is too large.'
+    default_code = 'upload_too_large'
+
+
+class ImageCheckBusy(exceptions.APIException):
+    status_code = 503
+    default_detail = 'Too many uploads in progress, please try again shortly.'
+    default_code = 'image_check_busy'
+
+
+class HashedUploadedFile(TemporaryUploadedFile):
+    """
+    Upload streamed to a temp file in ``temp_dir``, with the sha256 of its
+    content computed on the way.
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None, temp_dir=None):
+        file = tempfile.NamedTemporaryFile(suffix='.upload', dir=temp_dir)
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+        self.hasher = hashlib.sha256()
+        self.content_hash = None
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Streams every file of the request to disk, never holding more than a
+    chunk in memory, and refuses anything over ``max_bytes`` with a 413 as
+    soon as that many bytes arrived.
+    """
+
+    def __init__(self, request=None, max_bytes=None, temp_dir=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes if max_bytes is not None else upload_options()['MAX_BYTES']
+        self.temp_dir = temp_dir
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # allow some room for the multipart headers and the other fields
+        if content_length > self.max_bytes + 64 * 1024:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.file = HashedUploadedFile(self.file_name, self.content_type, 0, self.charset,
+                                       self.content_type_extra, self.temp_dir)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.file.close()
+            raise UploadTooLarge()
+        self.file.write(raw_data)
+        self.file.hasher.update(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.content_hash = self.file.hasher.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.close()
+
+
+_check_slots = None
+_check_slots_lock = threading.Lock()
+
+
+def _get_check_slots():
+    global _check_slots
+    if _check_slots is None:
+        with _check_slots_lock:
+            if _check_slots is None:
+                _check_slots = threading.BoundedSemaphore(upload_options()['MAX_CHECKS'])
+    return _check_slots
+
+
+def check_image_file(path):
+    """
+    Decode the image at ``path`` in a child process (api.imagecheck) with
+    limited CPU time and memory; return its format or raise ValidationError.
+
+    At most ``MAX_CHECKS`` children run at once per process.
+    """
+    options = upload_options()
+    slots = _get_check_slots()
+    if not slots.acquire(timeout=options['CHECK_TIMEOUT']):
+        raise ImageCheckBusy()
+    try:
+        result = subprocess.run(
+            [sys.executable, '-m', 'api.imagecheck', path, str(options['MAX_PIXELS']),
+             str(options['CHECK_TIMEOUT']), str(options['CHECK_MEMORY'])],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=options['CHECK_TIMEOUT'],
+        )
+    except subprocess.TimeoutExpired:
+        raise serializers.ValidationError('Invalid image file.')
+    finally:
+        slots.release()
+    if result.returncode != 0:
+        raise serializers.ValidationError(result.stdout.strip() or 'Invalid image file.')
+    return result.stdout.strip()
+
+
+def validate_image_upload(value):
+    # sets ``value.image_format`` to the format Pillow detected
+    if hasattr(value, 'temporary_file_path'):
+        value.image_format = check_image_file(value.temporary_file_path())
+        return value
+    # uploads kept in memory by the default handlers
+    with tempfile.NamedTemporaryFile(dir=getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None)) as copy:
+        for chunk in value.chunks():
+            copy.write(chunk)
+        copy.flush()
+        value.image_format = check_image_file(copy.name)
+    value.seek(0)
+    return value
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Names every file by the sha256 of its content, sharded as
+    ``<upload_to>/ab/cd/abcd....ext``, so the same picture is stored once no
+    matter how often or by whom it is uploaded. The extension comes from the
+    detected image format (validate_image_upload, run here if it wasn't
+    yet), so the uploaded name can't make it anything but an image.
+
+    New files are moved into place with an atomic rename, so a reader never
+    sees half a file. Uploads from HashingUploadHandler already carry their
+    hash and sit in ``temp_dir()`` on the same filesystem, so saving them is
+    a single rename.
+    """
+
+    def temp_dir(self):
+        path = self.path('tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _hash(self, content):
+        content_hash = getattr(content, 'content_hash', None)
+        if content_hash is None:
+            hasher = hashlib.sha256()
+            for chunk in content.chunks():
+                hasher.update(chunk)
+            content_hash = hasher.hexdigest()
+        return content_hash
+
+    def save(self, name, content, max_length=None):
+        if getattr(content, 'image_format', None) is None:
+            content = validate_image_upload(content)
+        ext = IMAGE_EXTENSIONS[content.image_format]
+        directory = os.path.dirname(name)
+        content_hash = self._hash(content)
+        name = '/'.join(part for part in (directory, content_hash[:2], content_hash[2:4], content_hash + ext) if part)
+        if self.exists(name):
+            return name
+
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        source = content.temporary_file_path() if hasattr(content, 'temporary_file_path') else None
+        if source is None or os.stat(source).st_dev != os.stat(os.path.dirname(full_path)).st_dev:
+            # copy next to the target first so the rename stays atomic
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(full_path), delete=False) as copy:
+                content.seek(0)
+                for chunk in content.chunks():
+                    copy.write(chunk)
+            source = copy.name
+        os.replace(source, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+
+profile_pic_storage = ContentAddressedStorage()
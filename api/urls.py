@@ -1,14 +1,24 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('todos/', views.TodoListCreate.as_view()),
+    path('todos/batch/', views.TodoBatch.as_view()),
+    path('todos/sync/', views.TodoSync.as_view()),
+    path('todos/export/<str:export_format>', views.TodoExport.as_view()),
     path('todos/<int:pk>', views.TodoRetrieveUpdateDestroy.as_view()),
     path('todos/<int:pk>/complete', views.TodoToggleComplete.as_view()),
     path('signup/', views.signup,),
+    path('signup/check/', views.signup_check, name='signup-check'),
     path('login/', views.login,),
+    path('token/refresh/', views.RefreshTokenView.as_view(), name='token-refresh'),
     path('change-password/', views.ChangePasswordView.as_view(), name='change-password'),
     path('users/', views.CustomUserAPIView.as_view(), name='users'),
+    path('auth/throttle-stats/', views.ThrottleStatsView.as_view(), name='throttle-stats'),
+    # async variants for the ASGI deployment, see api/async_views.py
+    path('async/signup/', async_views.signup, name='async-signup'),
+    path('async/login/', async_views.login, name='async-login'),
+    path('async/change-password/', async_views.change_password, name='async-change-password'),
     # path('reset-password/', views.ResetPasswordView.as_view(), name='reset-password'),
     # path('reset-password-confirm/<str:uidb64>/<str:token>/', views.ResetPasswordConfirmView.as_view(), name='reset-password-confirm'),
 ]
@@ -1,8 +1,24 @@
+import itertools
+
+from django.conf import settings
+from django.core import signing
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions
-
+from rest_framework.exceptions import NotFound
+
+from .batch import apply_todo_batch
+from .bloom import get_username_filter
+from .conditional import ConditionalGetMixin, queryset_state
+from .pagination import KeysetPagination, SearchPagination, decode_cursor, encode_cursor
+from .streaming import csv_stream, iterate_keyset, ndjson_stream
+from .throttling import get_login_throttle, throttled_payload
+from .uploads import HashingUploadHandler, profile_pic_storage
+from .tokens import (bump_token_version, issue_signed_tokens, login_tokens, read_refresh_token,
+                     signed_tokens_enabled, use_refresh_session)
 from .serializers import TodoSerializer, TodoToggleCompleteSerializer
-from todo.models import Todo
+from todo.models import ArchivedTodo, Todo, TodoTombstone
+from todo.search import TodoSearch
 from django.contrib.auth import get_user_model
 from rest_framework.decorators import api_view
 from rest_framework.parsers import JSONParser
@@ -14,8 +30,8 @@ from rest_framework import status
 from django.middleware.csrf import get_token
 # for just display 
 from rest_framework.renderers import JSONRenderer
-from .models import CustomUser
-from .serializers import CustomUserSerializer
+from .models import CustomUser, TokenVersion
+from .serializers import CustomUserSerializer, signup_credentials_error
 from rest_framework.views import APIView
 from rest_framework import permissions
 
@@ -29,40 +45,66 @@ class CustomUserAPIView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return get_object_or_404(CustomUser, user=self.request.user)
 
+    def initialize_request(self, request, *args, **kwargs):
+        request = super().initialize_request(request, *args, **kwargs)
+        # stream uploads to disk with a size cap, hashing them on the way
+        request.upload_handlers = [HashingUploadHandler(request, temp_dir=profile_pic_storage.temp_dir())]
+        return request
+
     def put(self, request, *args, **kwargs):
         custom_user = self.get_object()
-        serializer = self.serializer_class(custom_user, data=request.data, partial=True)
+        serializer = self.serializer_class(custom_user, data=request.data, partial=True,
+                                           context=self.get_serializer_context())
         if serializer.is_valid():
-            custom_user.save_profile_pic(request)
             serializer.save()
             return Response(serializer.data)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
 
+def todo_list_sources(request):
+    # Completed todos move to the archive after a while; the lists only read
+    # the hot table unless the client opts in with ?include_archived=1.
+    todos = Todo.objects.filter(user=request.user)
+    if request.query_params.get('include_archived') in ('1', 'true'):
+        return [todos, ArchivedTodo.objects.filter(user=request.user)]
+    return todos
+
+
 class TodoList(generics.ListAPIView):
     # ListAPIView requires two mandatory attributes, serializer_class and
     # queryset.
     # We specify TodoSerializer which we have earlier implemented
     serializer_class = TodoSerializer
+    pagination_class = KeysetPagination
     def get_queryset(self):
-        user = self.request.user
-        return Todo.objects.filter(user=user).order_by('-created')
+        return todo_list_sources(self.request)
 
-class TodoListCreate(generics.ListCreateAPIView):
+class TodoListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     # ListAPIView requires two mandatory attributes, serializer_class and
     # queryset.
     # We specify TodoSerializer which we have earlier implemented
     serializer_class = TodoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    @property
+    def pagination_class(self):
+        # ?q= returns ranked matches paged by offset, the plain list is paged
+        # by cursor
+        return SearchPagination if self.request.query_params.get('q') else KeysetPagination
     def get_queryset(self):
         user = self.request.user
-        return Todo.objects.filter(user=user).order_by('-created')
+        query = self.request.query_params.get('q')
+        if query:
+            return TodoSearch(user, query)
+        return todo_list_sources(self.request)
+    def get_conditional_state(self, request, lookup=None):
+        # the whole hot list, whatever ?q= or the cursor select from it
+        return queryset_state(Todo.objects.filter(user=request.user))[0], None
     def perform_create(self, serializer):
         #serializer holds a django model
         serializer.save(user=self.request.user)
 
-class TodoRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class TodoRetrieveUpdateDestroy(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TodoSerializer
     permission_classes = [permissions.IsAuthenticated]
     def get_queryset(self):
@@ -78,12 +120,131 @@ class TodoToggleComplete(generics.UpdateAPIView):
         user = self.request.user
         return Todo.objects.filter(user=user)
     def perform_update(self,serializer):
-        serializer.instance.completed=not(serializer.instance.completed)
+        serializer.instance.toggle_completed()
         serializer.save()
 
+class TodoSync(APIView):
+    # Returns the todos changed and the ids deleted since the client's last
+    # sync, oldest change first, at most ?page_size= of them; while ``more``
+    # is true the client asks again with the new cursor. The cursor is
+    # opaque; clients send back the one they received.
+    #
+    # It holds a number of the user's change sequence (TodoChangeCounter),
+    # not a timestamp: numbers become visible in the order they were handed
+    # out, so a change that commits after a sync still sorts after its cursor.
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 500
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get(self, request):
+        user = request.user
+        limit = self.get_page_size(request)
+        since = request.query_params.get('since')
+        if since:
+            since = decode_cursor(since, 1)[0]
+            if not isinstance(since, int):
+                raise NotFound('Invalid cursor')
+        else:
+            since = 0
+
+        changes = [(todo.change_seq, todo) for todo in
+                   Todo.objects.filter(user=user, change_seq__gt=since).order_by('change_seq')[:limit + 1]]
+        if request.query_params.get('since'):
+            changes += TodoTombstone.objects.filter(user=user, change_seq__gt=since).order_by(
+                'change_seq').values_list('change_seq', 'todo_id')[:limit + 1]
+        # else first sync: there is nothing to delete yet
+        changes.sort(key=lambda change: change[0])
+        more = len(changes) > limit
+        changes = changes[:limit]
+
+        changed = [change for _, change in changes if isinstance(change, Todo)]
+        deleted = {change for _, change in changes if not isinstance(change, Todo)}
+        return Response({
+            'changed': TodoSerializer(changed, many=True).data,
+            'deleted': sorted(deleted),
+            'cursor': encode_cursor([changes[-1][0] if changes else since]),
+            'more': more,
+        })
+
+
+class TodoExport(APIView):
+    # Streams every todo of the user, archived ones included, as NDJSON or
+    # CSV. Rows are read in keyset chunks, so memory stays flat however many
+    # todos there are.
+    permission_classes = [permissions.IsAuthenticated]
+    fields = ['id', 'title', 'memo', 'created', 'completed', 'updated']
+    chunk_size = 1000
+    content_types = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+
+    def get(self, request, export_format):
+        if export_format not in self.content_types:
+            raise NotFound('Unknown export format')
+        chunks = itertools.chain.from_iterable(
+            iterate_keyset(model.objects.filter(user=request.user).values(*self.fields),
+                           ('-created', '-id'), self.chunk_size)
+            for model in (Todo, ArchivedTodo)
+        )
+        if export_format == 'csv':
+            content = csv_stream(chunks, self.fields)
+        else:
+            content = ndjson_stream(chunks)
+        response = StreamingHttpResponse(content, content_type=self.content_types[export_format])
+        response['Content-Disposition'] = f'attachment; filename="todos.{export_format}"'
+        return response
+
+
+class TodoBatch(APIView):
+    # Applies a list of create/update/delete/toggle operations in a single
+    # transaction, e.g. the offline edit queue replayed by the mobile clients.
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return Response({'error': 'Invalid request data', 'message': 'operations must be a non-empty list.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = getattr(settings, 'TODO_BATCH_MAX_OPERATIONS', 500)
+        if len(operations) > limit:
+            return Response({'error': 'Too many operations', 'message': f'A batch can hold at most {limit} operations.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        applied, results = apply_todo_batch(request.user, operations)
+        return Response({'applied': applied, 'results': results},
+                        status=status.HTTP_200_OK if applied else status.HTTP_400_BAD_REQUEST)
+
 User = get_user_model()
 import re
 
+# التحقق من توفر اسم المستخدم
+# Username availability check
+@api_view(['GET'])
+def signup_check(request):
+    wait = get_login_throttle().check(request, 'signup-check')
+    if wait:
+        response = Response(throttled_payload(wait), status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(wait)
+        return response
+
+    username = request.query_params.get('username', '')
+    if not username:
+        return Response({'error': 'Username is required', 'message': 'Please provide a username to check.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response({'username': username, 'available': not get_username_filter().is_taken(username)})
+
+
 # عملية التسجيل
 # Signup process
 @api_view(['POST'])
@@ -101,54 +262,30 @@ def signup(request):
 
         return response
 
+    wait = get_login_throttle().check(request, 'signup')
+    if wait:
+        response = Response(throttled_payload(wait), status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(wait)
+        return response
+
     data = JSONParser().parse(request)
     username = data.get('username')
     password = data.get('password')
 
-    if not username or not password:
-        # رسالة خطأ عندما يكون اسم المستخدم أو كلمة المرور غير موجودة
-        # Error message when either username or password is missing
-        response = Response(
-            {'error': 'Username and password are required', 'message': 'Please provide a valid username and password.'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-        response.accepted_media_type = 'application/json'
-        response.renderer_context = {}
-        response.accepted_renderer = JSONRenderer()
-
-        return response
-
-    if len(username) < 3:
-        # رسالة خطأ عندما يكون اسم المستخدم أقل من 3 أحرف
-        # Error message when the username is less than 3 characters
-        response = Response(
-            {'error': 'Invalid username', 'message': 'Username must be at least 3 characters long.'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-        response.accepted_media_type = 'application/json'
-        response.renderer_context = {}
-        response.accepted_renderer = JSONRenderer()
-
-        return response
-
-    if not re.match(r'^\d{6}$', password):
-        # رسالة خطأ عندما تحتوي كلمة المرور على أكثر أو أقل من 6 أرقام
-        # Error message when the password does not contain exactly 6 digits
-        response = Response(
-            {'error': 'Invalid password', 'message': 'Password must contain exactly 6 digits.'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    error = signup_credentials_error(username, password)
+    if error is not None:
+        response = Response(error, status=status.HTTP_400_BAD_REQUEST)
         response.accepted_media_type = 'application/json'
         response.renderer_context = {}
         response.accepted_renderer = JSONRenderer()
 
         return response
 
-    if not re.match(r'^\w+$', username):
-        # رسالة خطأ عندما يحتوي اسم المستخدم على حروف وأرقام وشرطات سفلية فقط
-        # Error message when the username contains characters other than alphanumeric and underscores
+    # يتم رفض اسم المستخدم المستخدم قبل تجزئة كلمة المرور
+    # A taken username is rejected before the password is hashed
+    if get_username_filter().is_taken(username):
         response = Response(
-            {'error': 'Invalid username', 'message': 'Username can only contain alphanumeric characters and underscores.'},
+            {'error': 'Username is already taken', 'message': 'The username you provided is already taken.'},
             status=status.HTTP_400_BAD_REQUEST
         )
         response.accepted_media_type = 'application/json'
@@ -161,9 +298,7 @@ def signup(request):
 
     try:
         user = UserModel.objects.create_user(username=username, password=password)
-        token, _ = Token.objects.get_or_create(user=user)
-
-        response_data = {'token': str(token)}
+        response_data = login_tokens(user)
         response_data['csrf_token'] = get_token(request)
 
         # رسالة نجاح عند إنشاء حساب جديد
@@ -220,6 +355,19 @@ def login(request):
 
         username = data.get('username')
         password = data.get('password')
+
+        # يتم رفض المحاولات الزائدة قبل أي استعلام أو تجزئة لكلمة المرور
+        # Excess attempts are rejected before any query or password hashing
+        wait = get_login_throttle().check(request, 'login', username)
+        if wait:
+            response = Response(throttled_payload(wait), status=status.HTTP_429_TOO_MANY_REQUESTS)
+            response['Retry-After'] = str(wait)
+            response.accepted_media_type = 'application/json'
+            response.renderer_context = {}
+            # تعيين البرنامج العارض المقبول على JSONRenderer
+            # Set the accepted renderer to JSONRenderer
+            response.accepted_renderer = JSONRenderer()
+            return response
         
         UserModel = get_user_model()
 
@@ -249,9 +397,7 @@ def login(request):
 
             return response
 
-        token, _ = Token.objects.get_or_create(user=user)
-
-        response_data = {'token': str(token)}
+        response_data = login_tokens(user)
         response_data['csrf_token'] = get_token(request)
         
         response = Response(response_data,status=status.HTTP_201_CREATED)
@@ -341,17 +487,22 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 #             return Response({'success': 'Password has been reset'}, status=status.HTTP_200_OK)
 
 #         return Response({'error': 'Invalid reset link'}, status=status.HTTP_400_BAD_REQUEST)
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from .authentication import CachedTokenAuthentication, SignedTokenAuthentication
 
 
 class ChangePasswordView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         user = request.user
+        wait = get_login_throttle().check(request, 'change-password', user.get_username())
+        if wait:
+            response = Response(throttled_payload(wait), status=status.HTTP_429_TOO_MANY_REQUESTS)
+            response['Retry-After'] = str(wait)
+            return response
         old_password = request.data.get('old_password')
         new_password = request.data.get('new_password')
         confirm_password = request.data.get('confirm_password')
@@ -385,5 +536,43 @@ class ChangePasswordView(APIView):
 
         # Invalidate existing tokens for the user
         Token.objects.filter(user=user).delete()
+        bump_token_version(user)
 
         return Response({'success': 'Password has been changed','message': 'Congratulations.'}, status=status.HTTP_200_OK)
+
+
+class RefreshTokenView(APIView):
+    # Trades a signed refresh token for a new access/refresh pair. Unlike
+    # access tokens the version is checked against the database here, so a
+    # revoked refresh token can't outlive a stale cache entry. Each refresh
+    # token works once; reusing one ends its session (api.tokens).
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        if not signed_tokens_enabled():
+            return Response({'error': 'Signed tokens are disabled', 'message': 'This server issues database tokens only.'},
+                            status=status.HTTP_404_NOT_FOUND)
+        try:
+            claims = read_refresh_token(str(request.data.get('refresh', '')))
+        except signing.BadSignature:
+            return Response({'error': 'Invalid refresh token', 'message': 'Your session has expired, please log in again.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+
+        user = User.objects.filter(pk=claims['uid'], is_active=True).first()
+        version = TokenVersion.objects.filter(user_id=claims['uid']).values_list('version', flat=True).first() or 0
+        session = None
+        if user is not None and claims['v'] == version:
+            session = use_refresh_session(claims)
+        if session is None:
+            return Response({'error': 'Invalid refresh token', 'message': 'Your session has expired, please log in again.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+        return Response(issue_signed_tokens(user, version, session), status=status.HTTP_200_OK)
+
+
+class ThrottleStatsView(APIView):
+    # Counters of the auth throttle in this worker, for staff dashboards.
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_login_throttle().stats())
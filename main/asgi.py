@@ -3,6 +3,10 @@ ASGI config for main project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Clients of this deployment should use the async/login/, async/signup/ and
+async/change-password/ routes, which hash passwords on a bounded pool
+instead of blocking a worker (see api/async_views.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
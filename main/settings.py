@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # serves STATIC_ROOT before the rest of the stack runs
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -56,7 +58,6 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
-    # 'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 CORS_ORIGIN_WHITELIST = [
 'http://localhost:3000',
@@ -65,10 +66,39 @@ CORS_ORIGIN_WHITELIST = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES':[
-    'rest_framework.authentication.TokenAuthentication',
+    'api.authentication.CachedTokenAuthentication',
+    'api.authentication.SignedTokenAuthentication',
                 ]
             }
 
+# 'db' makes login/signup issue rest_framework.authtoken tokens, 'signed'
+# issues short-lived HMAC-signed access tokens ("Authorization: Bearer ...")
+# plus a refresh token for token/refresh/. See api.tokens.
+AUTH_TOKEN_MODE = 'db'
+SIGNED_TOKEN_ACCESS_LIFETIME = 15 * 60
+SIGNED_TOKEN_REFRESH_LIFETIME = 14 * 24 * 60 * 60
+# How long a worker trusts its cached token version; a revocation made by
+# another worker takes at most this long to apply with a per-process cache.
+SIGNED_TOKEN_VERSION_CACHE_TIMEOUT = 60
+
+# Token -> user cache used by api.authentication.CachedTokenAuthentication.
+# 'local' keeps an LRU in each process; a token revoked in one worker keeps
+# working in the others until their entry expires, so TIMEOUT stays at a few
+# seconds. 'shared' goes through the CACHE_ALIAS cache instead, so revoking
+# a token reaches every worker at once and TIMEOUT can be longer.
+TOKEN_AUTH_CACHE = {
+    'BACKEND': 'local',
+    'CACHE_ALIAS': 'shared',
+    'TIMEOUT': 5,
+    'MAX_ENTRIES': 10000,
+}
+
+# Maximum number of operations accepted by one todos/batch/ request
+TODO_BATCH_MAX_OPERATIONS = 500
+# Completed todos older than this are moved to the archive table by
+# `manage.py archive_todos`
+TODO_ARCHIVE_AFTER_DAYS = 30
+
 ROOT_URLCONF = 'main.urls'
 
 TEMPLATES = [
@@ -103,6 +133,97 @@ DATABASES = {
     }
 }
 
+# 'default' is per process. 'shared' is seen by every worker process on this
+# host, like the SQLite database; point it at Redis or Memcached when serving
+# from several hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+}
+
+
+# Thread pool the async auth views (api/async_views.py) hash passwords on:
+# at most MAX_WORKERS hashes run at once and QUEUE_LIMIT more may wait,
+# further requests get a 503 straight away.
+PASSWORD_HASHING_POOL = {
+    'MAX_WORKERS': 4,
+    'QUEUE_LIMIT': 64,
+}
+
+# Sliding-window limits on login/signup/change-password attempts, checked
+# before any user lookup or hashing (api/throttling.py). Rates are
+# (attempts, seconds). 'memory' keeps the windows in each process, 'cache'
+# shares them through the CACHE_ALIAS Django cache. Set NUM_PROXIES when
+# running behind proxies so the client IP is read from X-Forwarded-For.
+LOGIN_THROTTLE = {
+    'BACKEND': 'memory',
+    'CACHE_ALIAS': 'default',
+    'USERNAME_RATE': (5, 60),
+    'IP_RATE': (30, 60),
+    'NUM_PROXIES': None,
+}
+
+# Bloom filter of existing usernames behind signup/check/ and the early
+# "username taken" reject in signup (api/bloom.py). Each process rebuilds
+# its filter in a background thread every REBUILD_INTERVAL seconds to pick
+# up other workers' users.
+USERNAME_FILTER = {
+    'ERROR_RATE': 0.01,
+    'REBUILD_INTERVAL': 300,
+}
+
+# Profile picture uploads (api/uploads.py): the byte cap applied while the
+# upload streams in, and the limits of the child process that decodes it.
+PROFILE_PIC_UPLOAD = {
+    'MAX_BYTES': 5 * 1024 * 1024,
+    'MAX_PIXELS': 40000000,
+    'CHECK_TIMEOUT': 5,
+    'CHECK_MEMORY': 512 * 1024 * 1024,
+    'MAX_CHECKS': 4,
+}
+
+# Resized copies of uploaded profile pictures (api/thumbnails.py), made on a
+# background thread pool after the upload is committed.
+PROFILE_PIC_THUMBNAILS = {
+    'SIZES': (64, 256, 1024),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+    'MAX_WORKERS': 2,
+}
+
+# Cached responses of the service catalog endpoints (services/cache.py).
+# A change to a service, option or offer invalidates them in every process
+# that shares CACHE_ALIAS, so with several workers it must be a shared
+# cache; with a per-process one the other workers serve the old catalog for
+# up to TIMEOUT seconds. They never outlive the next offer expiry.
+CATALOG_CACHE = {
+    'CACHE_ALIAS': 'shared',
+    'TIMEOUT': 300,
+}
+# Most rows accepted by service_requests/bulk/ in one request.
+SERVICE_REQUEST_BULK_MAX_ROWS = 1000
+# Longest a process serves prices from its offer index (services/offers.py)
+# without reloading it, for changes made elsewhere when the cache isn't shared.
+OFFER_INDEX_REFRESH_INTERVAL = 60
+# Longest date range services/<id>/availability/ answers for (services/slots.py).
+SLOT_AVAILABILITY_MAX_DAYS = 62
+# Longest date range of the staff calendar, service_requests/calendar/.
+SERVICE_REQUEST_CALENDAR_MAX_DAYS = 366
+
+# Visits of service requests (services/occurrences.py) are generated from the
+# requests on every read. With MATERIALIZE on they are also copied into a
+# table, kept in sync on save, for the days from KEEP_DAYS ago on; run
+# manage.py materialize_occurrences once after turning it on, then daily.
+OCCURRENCES = {
+    'MATERIALIZE': False,
+    'KEEP_DAYS': 31,
+    'BATCH_SIZE': 500,
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -141,10 +262,19 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
 STATIC_URL = '/static/'
-# STATIC_ROOT = BASE_DIR / 'static'
-# STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# collectstatic writes hashed file names plus .gz/.br copies here, WhiteNoise
+# serves them precompressed with a one-year immutable Cache-Control
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 STATICFILES_DIRS = [os.path.join(BASE_DIR,'static/')]
 
+# Uploaded files, served by api.media.serve (ETag, Range, caching). Names
+# under profiles/profile_pics are content hashes and cached as immutable,
+# everything else for MEDIA_CACHE_MAX_AGE seconds.
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_CACHE_MAX_AGE = 3600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment, Service, SubscriptionOption, ServiceRequest, ServiceRequestOffer
+from .models import Payment, Service, ServiceOccurrence, SlotOccupancy, SlotWindow, SubscriptionOption, ServiceRequest, ServiceRequestOffer
 
 class ServiceAdmin(admin.ModelAdmin):
     list_display = ('name', 'description', 'price', 'is_active')
@@ -18,9 +18,11 @@ class ServiceRequestOfferInline(admin.StackedInline):
 
 class ServiceRequestAdmin(admin.ModelAdmin):
     list_display = ('user', 'service','payment_status', 'subscription_type', 'subscription_option', 'date', 'time')
-    list_filter = ('service__name', 'subscription_type', 'subscription_option', 'date')
+    list_filter = ('status', 'service__name', 'subscription_type', 'subscription_option', 'date')
     search_fields = ('user__username', 'service__name')
-    ordering = ('-date',)
+    ordering = ('-date', '-time')
+    list_select_related = ('user', 'service', 'subscription_option')
+    date_hierarchy = 'date'
     inlines = [ServiceRequestOfferInline]
 
 admin.site.register(Service, ServiceAdmin)
@@ -33,4 +35,25 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ('user', 'service_request')
     search_fields = ('user__username', 'service_request__service__name')
 
-admin.site.register(Payment, PaymentAdmin)
\ No newline at end of file
+admin.site.register(Payment, PaymentAdmin)
+
+class SlotWindowAdmin(admin.ModelAdmin):
+    list_display = ('service', 'weekday', 'start', 'end', 'capacity')
+    list_filter = ('service__name', 'weekday')
+    ordering = ('service', 'weekday', 'start')
+
+class SlotOccupancyAdmin(admin.ModelAdmin):
+    list_display = ('window', 'date', 'booked')
+    list_filter = ('window__service__name', 'date')
+    ordering = ('-date',)
+
+admin.site.register(SlotWindow, SlotWindowAdmin)
+admin.site.register(SlotOccupancy, SlotOccupancyAdmin)
+
+class ServiceOccurrenceAdmin(admin.ModelAdmin):
+    list_display = ('service_request', 'visit', 'date', 'time')
+    list_filter = ('date',)
+    list_select_related = ('service_request__service', 'service_request__user')
+    ordering = ('date', 'time')
+
+admin.site.register(ServiceOccurrence, ServiceOccurrenceAdmin)
@@ -0,0 +1,127 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from rest_framework import serializers
+
+from services.models import Service, ServiceRequest, SubscriptionOption
+from services.occurrences import materialize_range
+from services.pricing import priced_options
+from services.slots import SlotUnavailable, find_slot, load_windows, reserve
+
+BOOKING_FIELDS = ('date', 'time', 'subscription_type', 'car_brand', 'car_model', 'car_color', 'car_number')
+
+
+class BookingRowSerializer(serializers.Serializer):
+    # Parses one row without touching the database; the related objects are
+    # looked up for the whole batch at once.
+    user = serializers.IntegerField(required=False)
+    service = serializers.IntegerField()
+    subscription_type = serializers.ChoiceField(choices=['one-time', 'monthly'])
+    subscription_option = serializers.IntegerField(required=False, allow_null=True)
+    date = serializers.DateField()
+    time = serializers.TimeField()
+    car_brand = serializers.CharField(required=False, allow_blank=True, default='')
+    car_model = serializers.CharField(required=False, allow_blank=True, default='')
+    car_color = serializers.CharField(required=False, allow_blank=True, default='')
+    car_number = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+def _lookup(model_objects, pk, field):
+    obj = model_objects.get(pk)
+    if obj is None:
+        raise ValidationError({field: [f'Invalid pk "{pk}" - object does not exist.']})
+    return obj
+
+
+def build_service_requests(rows, user=None):
+    """
+    Validate and price a batch of bookings with one query per related table.
+
+    Each row goes through the same rules as ServiceRequest.save (clean(),
+    field validation and get_total_price()), but against objects loaded up
+    front: options come from services.pricing with their discount annotated,
+    so pricing costs no query. Each booking is matched to its slot window
+    (services.slots), but places aren't reserved yet. Rows book for ``user``
+    unless they name one.
+
+    Returns ``(bookings, errors)``; ``errors`` maps row index to messages.
+    """
+    parsed = {}
+    errors = {}
+    for index, row in enumerate(rows):
+        serializer = BookingRowSerializer(data=row if isinstance(row, dict) else {})
+        if serializer.is_valid():
+            parsed[index] = serializer.validated_data
+        else:
+            errors[index] = serializer.errors
+
+    data = parsed.values()
+    services = Service.objects.in_bulk({row['service'] for row in data})
+    options = priced_options(SubscriptionOption.objects.filter(
+        id__in={row['subscription_option'] for row in data if row.get('subscription_option')}
+    )).in_bulk()
+    users = get_user_model().objects.in_bulk({row['user'] for row in data if 'user' in row})
+    windows = load_windows(services)
+
+    bookings = []
+    for index, row in parsed.items():
+        try:
+            booking = ServiceRequest(**{field: row[field] for field in BOOKING_FIELDS})
+            booking.user = _lookup(users, row['user'], 'user') if 'user' in row else user
+            if booking.user is None:
+                raise ValidationError({'user': ['This field is required.']})
+            booking.service = _lookup(services, row['service'], 'service')
+            if row.get('subscription_option'):
+                booking.subscription_option = _lookup(options, row['subscription_option'], 'subscription_option')
+            # the related fields were checked against the loaded objects above
+            booking.full_clean(exclude=['user', 'service', 'subscription_option', 'request_price'])
+            booking.request_price = booking.get_total_price()
+            booking.update_ledger()
+            booking.slot = find_slot(windows, booking.service_id, booking.date, booking.time)
+        except SlotUnavailable as exc:
+            errors[index] = {'time': [str(exc)]}
+            continue
+        except ValidationError as exc:
+            errors[index] = exc.message_dict if hasattr(exc, 'error_dict') else {'non_field_errors': exc.messages}
+            continue
+        except ValueError as exc:
+            errors[index] = {'non_field_errors': [str(exc)]}
+            continue
+        bookings.append(booking)
+    return bookings, dict(sorted(errors.items()))
+
+
+def book_service_requests(rows, user=None, batch_size=500):
+    """
+    Create every booking in ``rows`` with bulk inserts in one transaction,
+    or none of them if any row is invalid or its window is full.
+
+    Places are reserved with one UPDATE per window and day.
+
+    Returns ``(created, errors)``.
+    """
+    bookings, errors = build_service_requests(rows, user=user)
+    if errors:
+        return 0, errors
+    slots = defaultdict(list)
+    for index, booking in enumerate(bookings):
+        if booking.slot is not None:
+            slots[booking.slot, booking.date].append(index)
+    try:
+        with transaction.atomic():
+            for (window, date), indexes in slots.items():
+                try:
+                    reserve(window, date, count=len(indexes))
+                except SlotUnavailable as exc:
+                    errors.update((index, {'time': [str(exc)]}) for index in indexes)
+            if errors:
+                raise SlotUnavailable
+            ServiceRequest.objects.bulk_create(bookings, batch_size=batch_size)
+            # bulk_create sends no post_save and may not return the ids
+            if bookings:
+                materialize_range(min(booking.date for booking in bookings), max(booking.date for booking in bookings))
+    except SlotUnavailable:
+        return 0, dict(sorted(errors.items()))
+    return len(bookings), {}
@@ -0,0 +1,133 @@
+import datetime
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Min
+from django.utils import timezone
+from rest_framework.response import Response
+
+from api.conditional import ConditionalGetMixin, queryset_state
+from services.models import Service, ServiceRequestOffer, SubscriptionOption
+
+DEFAULT_CATALOG_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+VERSION_KEY = 'services:catalog-version'
+
+
+def catalog_cache_options():
+    return dict(DEFAULT_CATALOG_CACHE, **getattr(settings, 'CATALOG_CACHE', {}))
+
+
+def _cache():
+    return caches[catalog_cache_options()['CACHE_ALIAS']]
+
+
+def catalog_version():
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # start from the clock, so a version lost to eviction isn't reused
+        # while responses cached under it are still around
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def seconds_until_offer_change(now=None):
+    """
+    Seconds until the next unexpired offer expires, or None if there is none.
+
+    An offer counts until the end of its offer_expiry day (the catalog
+    compares it against timezone.now().date()), so the boundary is midnight
+    after the earliest such day.
+    """
+    if now is None:
+        now = timezone.now()
+    next_expiry = ServiceRequestOffer.objects.filter(
+        subscription_option__isnull=False, offer_expiry__gte=now.date(),
+    ).aggregate(next_expiry=Min('offer_expiry'))['next_expiry']
+    if next_expiry is None:
+        return None
+    boundary = datetime.datetime.combine(next_expiry + datetime.timedelta(days=1), datetime.time(), tzinfo=now.tzinfo)
+    return max(0, int((boundary - now).total_seconds()))
+
+
+def catalog_timeout():
+    timeout = catalog_cache_options()['TIMEOUT']
+    until_change = seconds_until_offer_change()
+    if until_change is not None:
+        timeout = min(timeout, until_change)
+    return timeout
+
+
+def cached_catalog_response(request, render):
+    """
+    Answer from the catalog cache, or call ``render()`` for the Response and
+    cache its data.
+
+    Entries are keyed by the catalog version, which services.signals bumps on
+    every change to a Service, SubscriptionOption or ServiceRequestOffer,
+    and they never outlive the next offer expiry. The bump only reaches the
+    processes sharing CACHE_ALIAS, so with several workers that cache must
+    be shared; a per-process one serves other workers' changes late, by up
+    to TIMEOUT.
+    """
+    cache = _cache()
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    key = f'services:catalog:{catalog_version()}:{path}'
+    data = cache.get(key)
+    if data is not None:
+        response = Response(data)
+        response['X-Catalog-Cache'] = 'hit'
+        return response
+
+    response = render()
+    if response.status_code == 200:
+        timeout = catalog_timeout()
+        if timeout > 0:
+            cache.set(key, response.data, timeout)
+    response['X-Catalog-Cache'] = 'miss'
+    return response
+
+
+class CatalogCacheMixin:
+    """Serves list and retrieve of a catalog view through the catalog cache."""
+
+    def list(self, request, *args, **kwargs):
+        return cached_catalog_response(request, lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_catalog_response(request, lambda: super(CatalogCacheMixin, self).retrieve(request, *args, **kwargs))
+
+
+def catalog_state(request, *args, **kwargs):
+    """
+    The count and latest ``updated`` of the Service, SubscriptionOption and
+    ServiceRequestOffer tables, plus the date, in three aggregate queries.
+
+    Taken from the tables rather than the catalog version, so a change made
+    by any process moves it, whatever cache each process uses. Prices also
+    change when an offer lapses at midnight.
+    """
+    states = [queryset_state(model.objects.all())[0] for model in (Service, SubscriptionOption, ServiceRequestOffer)]
+    return f"{':'.join(states)}:{timezone.now().date()}", None
+
+
+class CatalogConditionalGetMixin(ConditionalGetMixin):
+    """Conditional GET for catalog views, validated by the catalog tables alone."""
+
+    def get_conditional_state(self, request, lookup=None):
+        return catalog_state(request)
@@ -0,0 +1,61 @@
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from services.models import Payment, ServiceRequest
+
+
+def post_payment(service_request_id, amount):
+    """
+    Add ``amount`` (negative to take a payment back) to a request's ledger
+    columns in one UPDATE.
+
+    Every right-hand side reads the row as it was before the UPDATE, so the
+    new total is spelled out in each of them; concurrent payments of the
+    same request add up without reading the row first. Called by Payment
+    inside the transaction that writes the payment.
+    """
+    paid_total = F('paid_total') + amount
+    ServiceRequest.objects.filter(pk=service_request_id).update(
+        paid_total=paid_total, updated=timezone.now(), **_settle(paid_total),
+    )
+
+
+def _settle(paid_total):
+    return {
+        'balance': F('request_price') - paid_total,
+        'status': Case(
+            When(request_price__isnull=False, request_price__lte=paid_total, then=Value('success')),
+            default=Value('pending'),
+        ),
+    }
+
+
+def rebuild_ledger(queryset):
+    # recompute the ledger columns of ``queryset`` from the payments, in SQL
+    paid = Payment.objects.filter(service_request=OuterRef('pk')).values('service_request').annotate(
+        total=Sum('amount')).values('total')
+    paid_total = Coalesce(Subquery(paid), Value(0), output_field=DecimalField(max_digits=10, decimal_places=2))
+    queryset.update(paid_total=paid_total, **_settle(paid_total))
+
+
+def ledger_mismatches(queryset=None):
+    """
+    Yield ``(service_request, stored, expected)`` for every request whose
+    paid_total, balance or status differs from what its Payment rows give.
+
+    ``stored`` and ``expected`` map those three fields to their values.
+    """
+    if queryset is None:
+        queryset = ServiceRequest.objects.all()
+    queryset = queryset.annotate(
+        summed=Sum('payment__amount', output_field=DecimalField(max_digits=10, decimal_places=2)),
+    ).order_by('id')
+    fields = ServiceRequest.LEDGER_FIELDS
+    for service_request in queryset.iterator(chunk_size=2000):
+        stored = {field: getattr(service_request, field) for field in fields}
+        service_request.paid_total = service_request.summed or 0
+        service_request.update_ledger()
+        expected = {field: getattr(service_request, field) for field in fields}
+        if stored != expected:
+            yield service_request, stored, expected
@@ -0,0 +1,52 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from services.booking import book_service_requests
+
+
+def read_rows(path, file_format):
+    with open(path, newline='', encoding='utf-8') as handle:
+        if file_format == 'csv':
+            rows = list(csv.DictReader(handle))
+        else:
+            rows = [json.loads(line) for line in handle if line.strip()]
+    # empty CSV cells mean "not given"
+    return [{key: value for key, value in row.items() if value not in ('', None)} for row in rows]
+
+
+class Command(BaseCommand):
+    help = ('Book service requests in bulk from a CSV or NDJSON file with service, subscription_type, '
+            'subscription_option, date, time and optional car_* and user (id) columns. '
+            'Nothing is created unless every row is valid.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row, or NDJSON file.')
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format; guessed from the file extension by default.')
+        parser.add_argument('--user', help='Username the rows without a user column are booked for.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT statement.')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or ('csv' if options['path'].lower().endswith('.csv') else 'ndjson')
+        try:
+            rows = read_rows(options['path'], file_format)
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        user = None
+        if options['user']:
+            User = get_user_model()
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist.")
+
+        created, errors = book_service_requests(rows, user=user, batch_size=options['batch_size'])
+        for index, messages in errors.items():
+            self.stderr.write(f'Row {index + 1}: {json.dumps(messages)}')
+        if errors:
+            raise CommandError(f'{len(errors)} invalid rows, nothing was booked.')
+        self.stdout.write(self.style.SUCCESS(f'Booked {created} service requests.'))
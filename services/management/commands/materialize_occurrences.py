@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from services.models import ServiceOccurrence
+from services.occurrences import hot_since, materialize_range, occurrence_options, prune_occurrences
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the materialized visits of every request from OCCURRENCES["KEEP_DAYS"] ago on, '
+            'and drop older ones. Run it once after turning OCCURRENCES["MATERIALIZE"] on, '
+            'then daily to prune.')
+
+    def handle(self, *args, **options):
+        if not occurrence_options()['MATERIALIZE']:
+            raise CommandError('OCCURRENCES["MATERIALIZE"] is off, visits are generated on every read.')
+        pruned = prune_occurrences()
+        materialize_range(hot_since())
+        self.stdout.write(self.style.SUCCESS(
+            f'Pruned {pruned} past visits, {ServiceOccurrence.objects.count()} visits materialized.'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from services.models import ServiceRequest, SlotOccupancy
+from services.slots import SlotUnavailable, find_slot, load_windows
+
+
+class Command(BaseCommand):
+    help = ('Recount the places taken per slot window and day from the service requests, '
+            'after windows were added or changed or requests were edited outside the API.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assign', action='store_true',
+                            help='First put upcoming requests without a window into the window their time falls in.')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        if options['assign']:
+            self.assign()
+        counts = (ServiceRequest.objects.filter(slot__isnull=False)
+                  .values('slot', 'date').annotate(booked=Count('id')).order_by())
+        SlotOccupancy.objects.all().delete()
+        SlotOccupancy.objects.bulk_create(
+            SlotOccupancy(window_id=row['slot'], date=row['date'], booked=row['booked']) for row in counts
+        )
+        over = SlotOccupancy.objects.filter(booked__gt=F('window__capacity')).select_related('window')
+        for occupancy in over:
+            self.stderr.write(f'Overbooked: {occupancy} (capacity {occupancy.window.capacity})')
+        self.stdout.write(self.style.SUCCESS(f'Recounted {SlotOccupancy.objects.count()} window days.'))
+
+    def assign(self):
+        pending = list(ServiceRequest.objects.filter(slot__isnull=True, date__gte=timezone.now().date())
+                       .only('id', 'service_id', 'date', 'time'))
+        windows = load_windows(request.service_id for request in pending)
+        assigned = []
+        for request in pending:
+            try:
+                request.slot = find_slot(windows, request.service_id, request.date, request.time)
+            except SlotUnavailable as exc:
+                self.stderr.write(f'Request {request.pk}: {exc}')
+                continue
+            if request.slot is not None:
+                assigned.append(request)
+        # bulk_update skips save(), which would re-price and re-validate each request
+        ServiceRequest.objects.bulk_update(assigned, ['slot'], batch_size=500)
+        self.stdout.write(f'Assigned {len(assigned)} requests to a window.')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from services.ledger import ledger_mismatches, rebuild_ledger
+from services.models import ServiceRequest
+
+
+class Command(BaseCommand):
+    help = ('Check the paid_total, balance and status stored on every service request '
+            'against its payments, e.g. after payments were written with bulk_create or raw SQL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Store the recomputed values.')
+
+    def handle(self, *args, **options):
+        mismatches = []
+        for service_request, stored, expected in ledger_mismatches():
+            mismatches.append(service_request.pk)
+            self.stderr.write(f'Request {service_request.pk}: stored {stored}, payments give {expected}')
+        if mismatches and not options['fix']:
+            raise CommandError(f'{len(mismatches)} requests disagree with their payments; run with --fix to correct them.')
+        if mismatches:
+            # recomputed in the UPDATE itself, so payments made meanwhile are counted
+            rebuild_ledger(ServiceRequest.objects.filter(pk__in=mismatches))
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(mismatches)} requests.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Every request agrees with its payments.'))
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.19 on 2026-10-18 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0009_alter_servicerequest_request_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicerequest',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
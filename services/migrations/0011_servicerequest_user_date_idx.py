@@ -0,0 +1,17 @@
+# Generated by Django 3.2.19 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0010_servicerequest_updated'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['user', 'date', 'time', 'id'], name='servicerequest_user_date_idx'),
+        ),
+    ]
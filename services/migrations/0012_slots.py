@@ -0,0 +1,43 @@
+# Generated by Django 3.2.19 on 2026-10-18 20:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0011_servicerequest_user_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], help_text='Leave blank for every day; windows for a weekday replace the daily ones on that day', null=True)),
+                ('start', models.TimeField()),
+                ('end', models.TimeField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.service')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('window', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.slotwindow')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='servicerequest',
+            name='slot',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='services.slotwindow'),
+        ),
+        migrations.AddConstraint(
+            model_name='slotoccupancy',
+            constraint=models.UniqueConstraint(fields=('window', 'date'), name='slotoccupancy_window_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.19 on 2026-10-18 20:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0012_slots'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['date', 'time', 'id'], name='servicerequest_date_time_idx'),
+        ),
+    ]
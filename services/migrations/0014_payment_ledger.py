@@ -0,0 +1,49 @@
+# Generated by Django 3.2.19 on 2026-10-18 20:56
+
+from django.db import migrations, models
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def fill_ledger(apps, schema_editor):
+    ServiceRequest = apps.get_model('services', 'ServiceRequest')
+    Payment = apps.get_model('services', 'Payment')
+    paid = Payment.objects.filter(service_request=OuterRef('pk')).values('service_request').annotate(
+        total=Sum('amount')).values('total')
+    ServiceRequest.objects.update(paid_total=Coalesce(
+        Subquery(paid), Value(0), output_field=DecimalField(max_digits=10, decimal_places=2)))
+    ServiceRequest.objects.update(
+        balance=F('request_price') - F('paid_total'),
+        status=Case(When(request_price__isnull=False, request_price__lte=F('paid_total'), then=Value('success')),
+                    default=Value('pending')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0013_servicerequest_date_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicerequest',
+            name='balance',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='servicerequest',
+            name='paid_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='servicerequest',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('success', 'Success')], default='pending', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['status', 'date'], name='servicerequest_status_date_idx'),
+        ),
+        migrations.RunPython(fill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.19 on 2026-10-18 20:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0014_payment_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('visit', models.PositiveBigIntegerField()),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('service_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.servicerequest')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='serviceoccurrence',
+            index=models.Index(fields=['date', 'time'], name='serviceoccurrence_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='serviceoccurrence',
+            constraint=models.UniqueConstraint(fields=('service_request', 'visit'), name='serviceoccurrence_request_visit_uniq'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.19 on 2026-10-18 21:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0015_serviceoccurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='servicerequestoffer',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='subscriptionoption',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,5 +1,5 @@
 import datetime
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.contrib.auth.models import User
@@ -15,6 +15,8 @@ class Service(models.Model):
     description = models.TextField(null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2,null=True)
     is_active = models.BooleanField(default=True)
+    # set on every save; the catalog ETag is built from it, see services.cache
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -27,6 +29,7 @@ class SubscriptionOption(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     duration = models.PositiveIntegerField(help_text='Duration in days')
     slug = models.SlugField(unique=True, blank=True,null=True)
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.slug + self.name
@@ -35,10 +38,22 @@ class SubscriptionOption(models.Model):
         if not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+    def get_offer(self):
+        # a query, unless loaded by services.pricing which joins the offer in
+        try:
+            return self.servicerequestoffer
+        except ServiceRequestOffer.DoesNotExist:
+            return None
+    def get_discount(self):
+        # the discount of the offer if it hasn't expired, else None
+        if hasattr(self, 'discount'):  # annotated by services.pricing
+            return self.discount
+        from services.offers import get_offer_index
+        return get_offer_index().discount(self.pk)
     def get_offers(self):
-        offers = ServiceRequestOffer.objects.filter(subscription_option__slug=self.slug)
+        offer = self.get_offer()
         serialized_offers = []
-        for offer in offers:
+        if offer is not None:
             serialized_offer = {
                 'name': offer.offer_name,
                 'description': offer.offer_description,
@@ -48,36 +63,63 @@ class SubscriptionOption(models.Model):
             serialized_offers.append(serialized_offer)
         return serialized_offers
     def get_total_price(self):
-        offers = ServiceRequestOffer.objects.filter(subscription_option__slug=self.slug)
-        valid_offers = [offer for offer in offers if offer.offer_expiry >= timezone.now().date() ]  # Get only valid offers with an offer_discount attribute
-        if valid_offers:  # If there are valid offers associated with this subscription option
-            discount = max(offer.offer_price for offer in valid_offers)  # Get the maximum discount among all valid offers
+        discount = self.get_discount()
+        if discount is not None:  # If there is a valid offer associated with this subscription option
             discounted_price = self.price - discount  # Calculate the discounted price
             return {'total-price': f'{discounted_price}'}
         else:  # If there are no valid offers associated with this subscription option
             return {'total': f'{self.price}'}
     @property
     def total_price(self):
-        offers = ServiceRequestOffer.objects.filter(subscription_option__slug=self.slug)
-        valid_offers = [offer for offer in offers if offer.offer_expiry >= timezone.now().date() ]  # Get only valid offers with an offer_discount attribute
-        if valid_offers:  # If there are valid offers associated with this subscription option
-            discount = max(offer.offer_price for offer in valid_offers)  # Get the maximum discount among all valid offers
-            discounted_price = self.price - discount  # Calculate the discounted price
-            return discounted_price
+        discount = self.get_discount()
+        if discount is not None:  # If there is a valid offer associated with this subscription option
+            return self.price - discount  # Calculate the discounted price
         else:  # If there are no valid offers associated with this subscription option
             return self.price
     @property
     def payment_succeeded(self):
-        payments= Payment.objects.filter(service_request = self)
-        valid_payment = [payment for payment in payments if payment.status == 'success']
+        # the fully paid requests of this option, from their ledger columns
+        paid = ServiceRequest.objects.filter(subscription_option=self, status='success')
         payment = []
-        for payed in valid_payment:
+        for payed in paid.values('paid_total', 'status'):
             payment.append({
-                "amount":payed.amount,
-                "status":payed.status
+                "amount":payed['paid_total'],
+                "status":payed['status']
             })
         return payment
 
+class SlotWindow(models.Model):
+    # A daily time window of a service and how many bookings it takes.
+    # Services without windows take any number of bookings at any time.
+    service = models.ForeignKey(Service, on_delete=models.CASCADE)
+    weekday = models.PositiveSmallIntegerField(null=True, blank=True, choices=[
+        (0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday'),
+    ], help_text='Leave blank for every day; windows for a weekday replace the daily ones on that day')
+    start = models.TimeField()
+    end = models.TimeField()
+    capacity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.service} {self.get_weekday_display() or 'daily'} {self.start}-{self.end}"
+
+    def clean(self):
+        if self.start >= self.end:
+            raise ValidationError('The window must end after it starts.')
+
+class SlotOccupancy(models.Model):
+    # Bookings taken per window and day, kept by services.slots.
+    window = models.ForeignKey(SlotWindow, on_delete=models.CASCADE)
+    date = models.DateField()
+    booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'date'], name='slotoccupancy_window_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.window} {self.date}: {self.booked}"
+
 class ServiceRequest(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     
@@ -91,6 +133,27 @@ class ServiceRequest(models.Model):
     car_color = models.CharField(max_length=255,blank=True)
     car_number = models.CharField(max_length=255,blank=True)
     request_price = models.DecimalField(max_digits=10, decimal_places=2,null=True,blank=True)
+    # the window the booking holds a place in, see services.slots
+    slot = models.ForeignKey(SlotWindow, on_delete=models.SET_NULL, null=True, blank=True, editable=False)
+    # the payment ledger, kept by Payment and services.ledger
+    paid_total = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    balance = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    status = models.CharField(max_length=10, choices=[('pending', 'Pending'), ('success', 'Success')],
+                              default='pending', editable=False)
+    # also touched when its payments or offers change, see services.signals
+    updated = models.DateTimeField(auto_now=True)
+
+    LEDGER_FIELDS = ('paid_total', 'balance', 'status')
+
+    class Meta:
+        indexes = [
+            # the per-user list, paged by (date, time, id)
+            models.Index(fields=['user', 'date', 'time', 'id'], name='servicerequest_user_date_idx'),
+            # the staff calendar across all users, see services.views
+            models.Index(fields=['date', 'time', 'id'], name='servicerequest_date_time_idx'),
+            # unpaid requests by date
+            models.Index(fields=['status', 'date'], name='servicerequest_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.service}"+ '-'+f"{self.user}"
@@ -115,9 +178,29 @@ class ServiceRequest(models.Model):
     def save(self, *args, **kwargs):
         self.request_price = self.get_total_price()
         self.full_clean()
-        super().save(*args, **kwargs)
+        if self._state.adding or kwargs.get('update_fields') is not None:
+            self.update_ledger()
+            super().save(*args, **kwargs)
+            return
+        # paid_total belongs to the payments: write everything else and let
+        # the database work out the balance against the new price
+        from services.ledger import post_payment
+        fields = [field.name for field in self._meta.concrete_fields
+                  if not field.primary_key and field.name not in self.LEDGER_FIELDS]
+        with transaction.atomic():
+            super().save(*args, update_fields=fields, **kwargs)
+            post_payment(self.pk, 0)
+        self.refresh_from_db(fields=self.LEDGER_FIELDS)
+    def update_ledger(self):
+        # balance and status from paid_total and request_price, as services.ledger does in SQL
+        if self.request_price is None:
+            self.balance = None
+            self.status = 'pending'
+        else:
+            self.balance = self.request_price - self.paid_total
+            self.status = 'success' if self.paid_total >= self.request_price else 'pending'
     def get_offers(self):
-        offers = ServiceRequestOffer.objects.filter(service_request=self)
+        offers = self.servicerequestoffer_set.all()
         serialized_offers = []
         for offer in offers:
             serialized_offer = {
@@ -137,28 +220,10 @@ class ServiceRequest(models.Model):
             return self.subscription_option.total_price
         else:
             raise ValueError('Invalid subscription type or option.')
+    def get_paid_total(self):
+        return self.paid_total
     def payment_status(self):
-        payments= Payment.objects.filter(service_request__id = self.id)
-        valid_payment = [payment for payment in payments ]
-        payment = []
-        total_pays = 0 
-        needs = 0 
-        status ='pending'
-
-        for payed in valid_payment:
-            total_pays += payed.amount 
-            if total_pays != self.request_price:
-                needs = self.request_price - total_pays 
-            else:
-                status = 'success'
-                needs = 0
-            payment.append({
-                        "amount": payed.amount,
-                        "needs": needs,
-                        "status": status
-                    })
-        
-        return status
+        return self.status
     @property
     def total_price(self):
         if self.subscription_type == 'one-time':
@@ -182,6 +247,25 @@ class ServiceRequest(models.Model):
 
     
 
+class ServiceOccurrence(models.Model):
+    # One visit of a request, copied out by services.occurrences for the
+    # days it keeps materialized.
+    service_request = models.ForeignKey(ServiceRequest, on_delete=models.CASCADE)
+    visit = models.PositiveBigIntegerField()
+    date = models.DateField()
+    time = models.TimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service_request', 'visit'], name='serviceoccurrence_request_visit_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'time'], name='serviceoccurrence_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.service_request} visit {self.visit} on {self.date}"
+
 class ServiceRequestOffer(models.Model):
     service_request = models.ForeignKey(ServiceRequest, on_delete=models.CASCADE,null=True,blank=True)
     subscription_option = models.OneToOneField(SubscriptionOption, on_delete=models.CASCADE,null=True,blank=True)  # New field
@@ -189,6 +273,7 @@ class ServiceRequestOffer(models.Model):
     offer_description = models.TextField()
     offer_price = models.DecimalField(max_digits=10, decimal_places=2)
     offer_expiry = models.DateField()
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.offer_name
@@ -203,6 +288,20 @@ class Payment(models.Model):
     def __str__(self):
         return f"Payment for {self.service_request}"
 
+    def save(self, *args, **kwargs):
+        # the request's ledger moves in the same transaction, see services.ledger;
+        # deletes are taken back by services.signals
+        from services.ledger import post_payment
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = Payment.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'service_request_id', 'amount').first()
+            super().save(*args, **kwargs)
+            if previous is not None:
+                post_payment(previous[0], -previous[1])
+            post_payment(self.service_request_id, self.amount)
+
     @classmethod
     def create_payment(cls, user, service_request):
         amount = service_request.get_total_price()
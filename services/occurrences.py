@@ -0,0 +1,139 @@
+import datetime
+import heapq
+import itertools
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from services.models import ServiceOccurrence, ServiceRequest, SubscriptionOption
+
+DEFAULT_OCCURRENCES = {
+    'MATERIALIZE': False,
+    'KEEP_DAYS': 31,
+    'BATCH_SIZE': 500,
+}
+
+Occurrence = namedtuple('Occurrence', ['service_request_id', 'visit', 'date', 'time'])
+
+
+def occurrence_options():
+    return dict(DEFAULT_OCCURRENCES, **getattr(settings, 'OCCURRENCES', {}))
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def occurrences(service_request, start=None, end=None):
+    """
+    Lazily yield the visits of ``service_request`` from ``start`` to ``end``
+    (dates, inclusive, either may be None), in date order.
+
+    A one-time request is a single visit. A monthly one spreads the option's
+    ``count`` visits evenly over its ``duration`` days, visit k (from 0)
+    falling on day k * duration // count. The first and last visit inside
+    the window are worked out arithmetically, so only those are generated.
+    """
+    option = service_request.subscription_option
+    if service_request.subscription_type != 'monthly' or option is None:
+        if (start is None or service_request.date >= start) and (end is None or service_request.date <= end):
+            yield Occurrence(service_request.pk, 1, service_request.date, service_request.time)
+        return
+    count, duration = option.count, option.duration
+    if not count or not duration:
+        return
+    first, last = 0, count - 1
+    if start is not None and start > service_request.date:
+        first = max(first, _ceil_div((start - service_request.date).days * count, duration))
+    if end is not None:
+        if end < service_request.date:
+            return
+        last = min(last, _ceil_div(((end - service_request.date).days + 1) * count, duration) - 1)
+    for k in range(first, last + 1):
+        date = service_request.date + datetime.timedelta(days=k * duration // count)
+        yield Occurrence(service_request.pk, k + 1, date, service_request.time)
+
+
+def lookback_start(start):
+    # the earliest date of a request that can have visits from ``start`` on:
+    # a request's visits run for its option's duration, counting its date
+    longest = SubscriptionOption.objects.aggregate(longest=Max('duration'))['longest'] or 1
+    return start - datetime.timedelta(days=longest - 1)
+
+
+def hot_since():
+    # the first day the materialized table is kept for
+    return timezone.now().date() - datetime.timedelta(days=occurrence_options()['KEEP_DAYS'])
+
+
+def occurrences_between(start, end, queryset=None):
+    """
+    Lazily yield every visit from ``start`` to ``end`` of the requests in
+    ``queryset``, ordered by date, time and request.
+
+    Ranges the materialized table covers are one indexed query on it;
+    others are generated from the requests that can reach into the range,
+    found on the (date, time) index, holding one pending visit per request
+    rather than the visits of the whole range.
+    """
+    if queryset is None:
+        queryset = ServiceRequest.objects.all()
+    options = occurrence_options()
+    if options['MATERIALIZE'] and start >= hot_since():
+        rows = ServiceOccurrence.objects.filter(
+            service_request__in=queryset.values('pk'), date__range=(start, end),
+        ).order_by('date', 'time', 'service_request_id', 'visit').values_list(
+            'service_request_id', 'visit', 'date', 'time')
+        for row in rows.iterator(chunk_size=options['BATCH_SIZE']):
+            yield Occurrence(*row)
+        return
+    requests = queryset.filter(
+        date__range=(lookback_start(start), end),
+    ).select_related('subscription_option').order_by('date', 'time', 'id')
+    yield from heapq.merge(
+        *(occurrences(service_request, start, end) for service_request in requests.iterator()),
+        key=lambda occurrence: (occurrence.date, occurrence.time, occurrence.service_request_id, occurrence.visit),
+    )
+
+
+def materialize(service_requests):
+    """
+    Rewrite the materialized visits of ``service_requests`` (instances with
+    their subscription option), keeping only the days from KEEP_DAYS ago on.
+    A no-op unless OCCURRENCES['MATERIALIZE'] is on.
+    """
+    options = occurrence_options()
+    if not options['MATERIALIZE']:
+        return
+    since = hot_since()
+    service_requests = iter(service_requests)
+    while True:
+        batch = list(itertools.islice(service_requests, options['BATCH_SIZE']))
+        if not batch:
+            return
+        visits = itertools.chain.from_iterable(occurrences(service_request, start=since) for service_request in batch)
+        with transaction.atomic():
+            ServiceOccurrence.objects.filter(service_request__in=[service_request.pk for service_request in batch]).delete()
+            while True:
+                rows = [ServiceOccurrence(service_request_id=visit.service_request_id, visit=visit.visit,
+                                          date=visit.date, time=visit.time)
+                        for visit in itertools.islice(visits, options['BATCH_SIZE'])]
+                if not rows:
+                    break
+                ServiceOccurrence.objects.bulk_create(rows)
+
+
+def materialize_range(start, end=None):
+    # rewrite the visits of every request that can reach into start..end
+    requests = ServiceRequest.objects.filter(date__gte=lookback_start(start))
+    if end is not None:
+        requests = requests.filter(date__lte=end)
+    materialize(requests.select_related('subscription_option').iterator())
+
+
+def prune_occurrences():
+    # drop the materialized visits that fell out of the kept days
+    return ServiceOccurrence.objects.filter(date__lt=hot_since()).delete()[0]
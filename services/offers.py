@@ -0,0 +1,83 @@
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from services.cache import catalog_version
+from services.models import ServiceRequestOffer
+
+
+class OfferIndex:
+    """
+    Process-local map of subscription option id -> its unexpired offer.
+
+    A min-heap on offer_expiry drops offers as their day passes, without
+    rescanning the map. The whole index is reloaded in one query whenever
+    the catalog version moves (services.signals bumps it on every offer,
+    option or service change) or after ``refresh_interval`` seconds, which
+    bounds how long a change made by another process can go unseen when
+    the cache isn't shared.
+    """
+
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self._offers = {}
+        self._heap = []
+        self._version = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def _stale(self, version):
+        return version != self._version or time.monotonic() - self._loaded_at > self.refresh_interval
+
+    def _load(self, version, today):
+        offers = {}
+        heap = []
+        queryset = ServiceRequestOffer.objects.filter(subscription_option__isnull=False, offer_expiry__gte=today)
+        for offer in queryset.only('id', 'subscription_option_id', 'offer_price', 'offer_expiry'):
+            offers[offer.subscription_option_id] = offer
+            heap.append((offer.offer_expiry, offer.pk, offer.subscription_option_id))
+        heapq.heapify(heap)
+        self._offers, self._heap = offers, heap
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+    def _expire(self, today):
+        while self._heap and self._heap[0][0] < today:
+            _, offer_id, option_id = heapq.heappop(self._heap)
+            offer = self._offers.get(option_id)
+            if offer is not None and offer.pk == offer_id:
+                del self._offers[option_id]
+
+    def get(self, option_id):
+        """The option's offer if it hasn't expired, else None."""
+        today = timezone.now().date()
+        version = catalog_version()
+        with self._lock:
+            if self._stale(version):
+                self._load(version, today)
+            self._expire(today)
+            return self._offers.get(option_id)
+
+    def discount(self, option_id):
+        offer = self.get(option_id)
+        return offer.offer_price if offer is not None else None
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_offer_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = OfferIndex(getattr(settings, 'OFFER_INDEX_REFRESH_INTERVAL', 60))
+    return _index
@@ -0,0 +1,48 @@
+from django.db.models import Case, DecimalField, F, Prefetch, When
+from django.utils import timezone
+
+from services.models import Payment, Service, SubscriptionOption
+
+
+def priced_options(queryset=None, today=None):
+    """
+    SubscriptionOptions with their offer joined in and ``discount`` annotated
+    (the offer price while the offer hasn't expired, else NULL).
+
+    get_offers, get_total_price and total_price then run without queries, so
+    listing any number of options costs one query.
+    """
+    if queryset is None:
+        queryset = SubscriptionOption.objects.all()
+    if today is None:
+        today = timezone.now().date()
+    return queryset.select_related('servicerequestoffer').annotate(
+        discount=Case(
+            When(servicerequestoffer__offer_expiry__gte=today, then=F('servicerequestoffer__offer_price')),
+            default=None,
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+    )
+
+
+def catalog_services(queryset=None, today=None):
+    # Services with their priced options as ``subscription_options``: two
+    # queries for the whole catalog.
+    if queryset is None:
+        queryset = Service.objects.all()
+    return queryset.prefetch_related(
+        Prefetch('subscriptionoption_set', queryset=priced_options(today=today).order_by('id'),
+                 to_attr='subscription_options'),
+    )
+
+
+def with_payments(queryset):
+    """
+    ServiceRequests ready for listing: the subscription option joined in, and
+    payments and offers prefetched, so a page costs the same few queries
+    whatever its size. The paid total is a column, see services.ledger.
+    """
+    return queryset.select_related('subscription_option').prefetch_related(
+        Prefetch('payment_set', queryset=Payment.objects.order_by('id')),
+        'servicerequestoffer_set',
+    )
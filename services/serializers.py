@@ -11,7 +11,8 @@ class ServiceRequestSerializer(serializers.ModelSerializer):
     payments = serializers.SerializerMethodField(read_only=True)
 
     def get_payments(self, instance):
-        payments= Payment.objects.filter(service_request__id = instance.id)
+        # prefetched by services.pricing.with_payments on the list
+        payments = instance.payment_set.all()
         valid_payment = [payment for payment in payments ]
         payment = []
         total_pays = 0 
@@ -34,7 +35,7 @@ class ServiceRequestSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = ServiceRequest
-        fields = ['id', 'user', 'service', 'subscription_type', 'payment_status','payments','subscription_option', 'date', 'get_end_date','time', 'get_offers','request_price',]
+        fields = ['id', 'user', 'service', 'subscription_type', 'payment_status','payments','subscription_option', 'date', 'get_end_date','time', 'get_offers','request_price', 'paid_total', 'balance',]
         read_only_fields = ['id', 'user', 'get_offers']
 
     def validate(self, data):
@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from services.cache import bump_catalog_version
+from services.models import Payment, Service, ServiceRequest, ServiceRequestOffer, SubscriptionOption
+from services.ledger import post_payment
+from services.occurrences import materialize, occurrence_options
+from services.offers import get_offer_index
+from services.slots import release
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=SubscriptionOption)
+@receiver(post_delete, sender=SubscriptionOption)
+@receiver(post_save, sender=ServiceRequestOffer)
+@receiver(post_delete, sender=ServiceRequestOffer)
+def invalidate_catalog(sender, **kwargs):
+    # after the commit; a request served before it would otherwise cache
+    # the old rows under the new version
+    transaction.on_commit(bump_catalog_version)
+    # reloaded here even if the version bump went to another process's
+    # cache; also after the commit, or the reload could read the old rows
+    transaction.on_commit(get_offer_index().invalidate)
+
+
+@receiver(post_save, sender=ServiceRequestOffer)
+@receiver(post_delete, sender=ServiceRequestOffer)
+def touch_service_request(sender, instance, **kwargs):
+    # offers are part of the request's representation, so its ETag must move;
+    # payments move it through the ledger update
+    if instance.service_request_id is not None:
+        ServiceRequest.objects.filter(pk=instance.service_request_id).update(updated=timezone.now())
+
+
+@receiver(post_delete, sender=Payment)
+def reverse_payment(sender, instance, **kwargs):
+    # runs inside the delete's transaction
+    post_payment(instance.service_request_id, -instance.amount)
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def release_slot(sender, instance, **kwargs):
+    if instance.slot_id is not None:
+        release(instance.slot_id, instance.date)
+
+
+@receiver(post_save, sender=ServiceRequest)
+def materialize_visits(sender, instance, **kwargs):
+    materialize([instance])
+
+
+@receiver(post_save, sender=SubscriptionOption)
+def rematerialize_option_visits(sender, instance, created, **kwargs):
+    # count and duration decide where every visit of the option falls
+    if not created and occurrence_options()['MATERIALIZE']:
+        materialize(ServiceRequest.objects.filter(subscription_option=instance)
+                    .select_related('subscription_option').iterator())
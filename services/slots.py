@@ -0,0 +1,90 @@
+import datetime
+from collections import defaultdict
+
+from django.db.models import F
+
+from services.models import SlotOccupancy, SlotWindow
+
+
+class SlotUnavailable(Exception):
+    """The booking's window is full, or its time is outside the service's windows."""
+
+
+def load_windows(service_ids):
+    # service id -> its windows, in one query
+    windows = defaultdict(list)
+    for window in SlotWindow.objects.filter(service_id__in=set(service_ids)).order_by('start'):
+        windows[window.service_id].append(window)
+    return windows
+
+
+def windows_on(service_windows, date):
+    # windows for one weekday replace the daily ones on that day
+    weekday = [window for window in service_windows if window.weekday == date.weekday()]
+    return weekday or [window for window in service_windows if window.weekday is None]
+
+
+def find_slot(windows, service_id, date, time):
+    """
+    The window of ``windows`` (from load_windows) a booking falls in, or None
+    if its service has no windows. Raises SlotUnavailable if it has windows
+    but none covers the booking.
+    """
+    service_windows = windows.get(service_id)
+    if not service_windows:
+        return None
+    for window in windows_on(service_windows, date):
+        if window.start <= time < window.end:
+            return window
+    raise SlotUnavailable(f'{date} {time} is outside the service hours.')
+
+
+def reserve(window, date, count=1):
+    """
+    Take ``count`` places of ``window`` on ``date``, or raise SlotUnavailable.
+
+    The check and the increment are one conditional UPDATE, so concurrent
+    bookings of the last place can't both succeed: the database serializes
+    the writes to the row and the second finds it full. Call it inside the
+    transaction that saves the booking, so a failed save gives the places
+    back.
+    """
+    SlotOccupancy.objects.bulk_create([SlotOccupancy(window=window, date=date)], ignore_conflicts=True)
+    reserved = SlotOccupancy.objects.filter(
+        window=window, date=date, booked__lte=window.capacity - count,
+    ).update(booked=F('booked') + count)
+    if not reserved:
+        raise SlotUnavailable(f'No free places left between {window.start} and {window.end} on {date}.')
+
+
+def release(window_id, date, count=1):
+    SlotOccupancy.objects.filter(window_id=window_id, date=date, booked__gte=count).update(booked=F('booked') - count)
+
+
+def reserve_slot(service_id, date, time):
+    # the window reserved for one booking, or None if the service has none
+    window = find_slot(load_windows([service_id]), service_id, date, time)
+    if window is not None:
+        reserve(window, date)
+    return window
+
+
+def free_slots(service_id, start, end):
+    """
+    Every window of the service from ``start`` to ``end`` (inclusive) that has
+    a free place, with its number of free places, in two queries.
+    """
+    windows = load_windows([service_id]).get(service_id, [])
+    booked = {
+        (occupancy.window_id, occupancy.date): occupancy.booked
+        for occupancy in SlotOccupancy.objects.filter(window__service_id=service_id, date__range=(start, end))
+    }
+    slots = []
+    date = start
+    while date <= end:
+        for window in windows_on(windows, date):
+            free = window.capacity - booked.get((window.pk, date), 0)
+            if free > 0:
+                slots.append({'date': date, 'start': window.start, 'end': window.end, 'free': free})
+        date += datetime.timedelta(days=1)
+    return slots
@@ -1,3 +1,392 @@
-from django.test import TestCase
+import datetime
+import shutil
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from services.cache import catalog_version
+from services.booking import build_service_requests, book_service_requests
+from services.ledger import ledger_mismatches, rebuild_ledger
+from services.models import (Payment, Service, ServiceRequest, ServiceRequestOffer, SlotOccupancy, SlotWindow,
+                             SubscriptionOption)
+from services.occurrences import occurrences, occurrences_between
+from services.offers import get_offer_index
+from services.slots import SlotUnavailable, find_slot, load_windows, release, reserve
+
+
+class CatalogVersionTests(TestCase):
+    def test_version_moves_after_commit(self):
+        before = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Service.objects.create(name='Cleaning', price=10)
+            self.assertEqual(catalog_version(), before)
+        self.assertTrue(callbacks)
+        self.assertNotEqual(catalog_version(), before)
+
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': root},
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('alice'))
+        Service.objects.create(name='Cleaning', price=10)
+
+    def cache_status(self):
+        return self.client.get('/services/')['X-Catalog-Cache']
+
+    def test_entries_are_shared_between_processes(self):
+        self.assertEqual(self.cache_status(), 'miss')
+        # another worker starts with an empty per-process cache
+        caches['default'].clear()
+        self.assertEqual(self.cache_status(), 'hit')
+
+    def test_change_invalidates_the_shared_entries(self):
+        self.cache_status()
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.create(name='Waxing', price=20)
+        caches['default'].clear()
+        self.assertEqual(self.cache_status(), 'miss')
+        self.assertEqual(len(self.client.get('/services/').json()), 2)
+
+
+class OfferIndexTests(TestCase):
+    def test_new_offer_is_seen_after_commit(self):
+        service = Service.objects.create(name='Cleaning', price=10)
+        option = SubscriptionOption.objects.create(name='Monthly', count=4, service=service, description='',
+                                                   price=40, duration=30)
+        self.assertIsNone(get_offer_index().get(option.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceRequestOffer.objects.create(subscription_option=option, offer_name='Spring', offer_description='',
+                                               offer_price=30, offer_expiry=timezone.now().date())
+        self.assertEqual(get_offer_index().discount(option.pk), 30)
+
+    def test_expired_offer_is_ignored(self):
+        service = Service.objects.create(name='Cleaning', price=10)
+        option = SubscriptionOption.objects.create(name='Monthly', count=4, service=service, description='',
+                                                   price=40, duration=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceRequestOffer.objects.create(subscription_option=option, offer_name='Winter', offer_description='',
+                                               offer_price=30,
+                                               offer_expiry=timezone.now().date() - datetime.timedelta(days=1))
+        self.assertIsNone(get_offer_index().get(option.pk))
+
+
+class OccurrenceTests(TestCase):
+    day = datetime.date(2026, 3, 1)
+    time = datetime.time(9, 30)
+
+    def monthly(self, count, duration, pk=1):
+        option = SubscriptionOption(count=count, duration=duration)
+        return ServiceRequest(pk=pk, subscription_type='monthly', subscription_option=option, date=self.day,
+                              time=self.time)
+
+    def days(self, visits):
+        return [(visit.visit, (visit.date - self.day).days) for visit in visits]
+
+    def test_visits_are_spread_over_the_duration(self):
+        self.assertEqual(self.days(occurrences(self.monthly(4, 30))), [(1, 0), (2, 7), (3, 15), (4, 22)])
+
+    def test_window_skips_to_the_first_and_last_visit_inside(self):
+        service_request = self.monthly(4, 30)
+        visits = occurrences(service_request, self.day + datetime.timedelta(days=1), self.day + datetime.timedelta(days=15))
+        self.assertEqual(self.days(visits), [(2, 7), (3, 15)])
+        visits = occurrences(service_request, self.day + datetime.timedelta(days=16), self.day + datetime.timedelta(days=21))
+        self.assertEqual(self.days(visits), [])
+
+    def test_huge_count_is_generated_lazily(self):
+        service_request = self.monthly(10 ** 11, 30)
+        start = self.day + datetime.timedelta(days=29)
+        first = next(occurrences(service_request, start))
+        self.assertEqual(first.date, start)
+        self.assertEqual(first.visit, 96666666668)
+
+    def test_one_time_request(self):
+        service_request = ServiceRequest(pk=1, subscription_type='one-time', date=self.day, time=self.time)
+        self.assertEqual(self.days(occurrences(service_request)), [(1, 0)])
+        self.assertEqual(list(occurrences(service_request, end=self.day - datetime.timedelta(days=1))), [])
+
+    def test_between_reaches_back_by_the_longest_duration(self):
+        user = User.objects.create_user('alice')
+        service = Service.objects.create(name='Cleaning', price=10)
+        option = SubscriptionOption.objects.create(name='Monthly', count=4, service=service, description='',
+                                                   price=40, duration=30)
+        # bulk_create skips ServiceRequest.clean, which holds monthly
+        # requests to 30 days and to future dates
+        ServiceRequest.objects.bulk_create([
+            ServiceRequest(user=user, service=service, subscription_type='monthly', subscription_option=option,
+                           date=self.day, time=self.time),
+        ])
+        SubscriptionOption.objects.filter(pk=option.pk).update(duration=60)
+        start = self.day + datetime.timedelta(days=40)
+        visits = occurrences_between(start, start + datetime.timedelta(days=10))
+        self.assertEqual(self.days(visits), [(4, 45)])
+
+
+
+class SlotTests(TestCase):
+    def setUp(self):
+        self.day = timezone.now().date() + datetime.timedelta(days=3)
+        self.service = Service.objects.create(name='Cleaning', price=100)
+        self.morning = SlotWindow.objects.create(service=self.service, start=datetime.time(8), end=datetime.time(12),
+                                                 capacity=2)
+        self.user = User.objects.create_user('alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def booked(self, window=None, day=None):
+        occupancy = SlotOccupancy.objects.filter(window=window or self.morning, date=day or self.day).first()
+        return occupancy.booked if occupancy is not None else 0
+
+    def book(self, time, service=None):
+        return self.client.post('/service_requests/request/', {
+            'service': (service or self.service).pk, 'subscription_type': 'one-time',
+            'date': str(self.day), 'time': time,
+        }, format='json')
+
+    def test_reserve_stops_at_capacity(self):
+        reserve(self.morning, self.day)
+        reserve(self.morning, self.day)
+        with self.assertRaises(SlotUnavailable):
+            reserve(self.morning, self.day)
+        self.assertEqual(self.booked(), 2)
+        release(self.morning.pk, self.day)
+        reserve(self.morning, self.day)
+        self.assertEqual(self.booked(), 2)
+
+    def test_reserve_several_places(self):
+        with self.assertRaises(SlotUnavailable):
+            reserve(self.morning, self.day, count=3)
+        self.assertEqual(self.booked(), 0)
+        reserve(self.morning, self.day, count=2)
+        self.assertEqual(self.booked(), 2)
+
+    def test_release_never_goes_below_zero(self):
+        release(self.morning.pk, self.day)
+        self.assertEqual(self.booked(), 0)
+
+    def test_weekday_windows_replace_the_daily_ones(self):
+        special = SlotWindow.objects.create(service=self.service, weekday=self.day.weekday(),
+                                            start=datetime.time(9), end=datetime.time(10), capacity=1)
+        windows = load_windows([self.service.pk])
+        self.assertEqual(find_slot(windows, self.service.pk, self.day, datetime.time(9, 30)), special)
+        with self.assertRaises(SlotUnavailable):
+            find_slot(windows, self.service.pk, self.day, datetime.time(8, 30))
+        next_day = self.day + datetime.timedelta(days=1)
+        self.assertEqual(find_slot(windows, self.service.pk, next_day, datetime.time(8, 30)), self.morning)
+
+    def test_service_without_windows_takes_any_booking(self):
+        other = Service.objects.create(name='Waxing', price=10)
+        self.assertIsNone(find_slot(load_windows([other.pk]), other.pk, self.day, datetime.time(3)))
+
+    def test_booking_takes_a_place_until_full(self):
+        self.assertEqual([self.book('08:30').status_code for _ in range(3)], [201, 201, 409])
+        self.assertEqual(self.booked(), 2)
+        self.assertEqual(ServiceRequest.objects.filter(slot=self.morning).count(), 2)
+        self.assertEqual(self.book('13:00').status_code, 409)
+
+    def test_deleting_a_booking_gives_the_place_back(self):
+        self.book('08:30')
+        ServiceRequest.objects.get().delete()
+        self.assertEqual(self.booked(), 0)
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.service = Service.objects.create(name='Cleaning', price=100)
+        self.service_request = self.request_for(self.service)
+
+    def request_for(self, service):
+        return ServiceRequest.objects.create(user=self.user, service=service, subscription_type='one-time',
+                                             date=timezone.now().date() + datetime.timedelta(days=3),
+                                             time=datetime.time(9))
+
+    def pay(self, amount, service_request=None):
+        return Payment.objects.create(user=self.user, service_request=service_request or self.service_request,
+                                      amount=amount)
+
+    def ledger(self, service_request=None):
+        service_request = service_request or self.service_request
+        service_request.refresh_from_db()
+        return service_request.paid_total, service_request.balance, service_request.status
+
+    def test_new_request_is_unpaid(self):
+        self.assertEqual(self.ledger(), (0, 100, 'pending'))
+
+    def test_payments_add_up(self):
+        self.pay(30)
+        self.assertEqual(self.ledger(), (30, 70, 'pending'))
+        self.pay(70)
+        self.assertEqual(self.ledger(), (100, 0, 'success'))
+
+    def test_editing_a_payment(self):
+        payment = self.pay(30)
+        payment.amount = Decimal('100')
+        payment.save()
+        self.assertEqual(self.ledger(), (100, 0, 'success'))
+
+    def test_moving_a_payment_to_another_request(self):
+        other = self.request_for(self.service)
+        payment = self.pay(100)
+        payment.service_request = other
+        payment.save()
+        self.assertEqual(self.ledger(), (0, 100, 'pending'))
+        self.assertEqual(self.ledger(other), (100, 0, 'success'))
+
+    def test_deleting_a_payment_takes_it_back(self):
+        self.pay(100).delete()
+        self.assertEqual(self.ledger(), (0, 100, 'pending'))
+
+    def test_repricing_keeps_the_payments(self):
+        self.pay(100)
+        self.service_request.service = Service.objects.create(name='Detailing', price=150)
+        self.service_request.save()
+        self.assertEqual(self.ledger(), (100, 50, 'pending'))
+
+    def test_mismatches_are_found_and_rebuilt(self):
+        self.pay(40)
+        ServiceRequest.objects.filter(pk=self.service_request.pk).update(paid_total=0, balance=100)
+        mismatches = list(ledger_mismatches())
+        self.assertEqual(len(mismatches), 1)
+        service_request, stored, expected = mismatches[0]
+        self.assertEqual((stored['paid_total'], expected['paid_total'], expected['balance']), (0, 40, 60))
+        rebuild_ledger(ServiceRequest.objects.all())
+        self.assertEqual(self.ledger(), (40, 60, 'pending'))
+        self.assertEqual(list(ledger_mismatches()), [])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.service = Service.objects.create(name='Cleaning', price=10)
+        self.option = SubscriptionOption.objects.create(name='Monthly', count=4, service=self.service,
+                                                        description='', price=100, duration=30)
+        self.offer = ServiceRequestOffer.objects.create(
+            subscription_option=self.option, offer_name='Spring', offer_description='', offer_price=5,
+            offer_expiry=timezone.now().date() + datetime.timedelta(days=7))
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return lambda: self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_catalog_etag_moves_without_the_version_bump(self):
+        # the on_commit bump never runs here, as in a worker that didn't
+        # handle the write
+        for url in ('/services/', '/services/all/', f'/subscription_options/{self.option.pk}/'):
+            with self.subTest(url=url):
+                again = self.revalidate(url)
+                self.assertEqual(again().status_code, 304)
+                SubscriptionOption.objects.filter(pk=self.option.pk).update(updated=timezone.now())
+                self.assertEqual(again().status_code, 200)
+
+    def test_detail_etag_moves_with_the_option_offer(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            service_request = ServiceRequest.objects.create(
+                user=self.user, service=self.service, subscription_type='monthly', subscription_option=self.option,
+                date=timezone.now().date() + datetime.timedelta(days=3), time=datetime.time(9))
+        url = f'/service_requests/{service_request.pk}/detail/'
+        self.assertEqual(self.client.get(url).json()['get_total_price'], 95)
+        again = self.revalidate(url)
+        self.assertEqual(again().status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.offer.offer_price = 40
+            self.offer.save()
+        response = again()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['get_total_price'], 60)
+
+
+class BulkBookingTests(TestCase):
+    def setUp(self):
+        self.day = timezone.now().date() + datetime.timedelta(days=3)
+        self.user = User.objects.create_user('alice')
+        self.other = User.objects.create_user('bob')
+        self.service = Service.objects.create(name='Cleaning', price=100)
+        self.option = SubscriptionOption.objects.create(name='Monthly', count=4, service=self.service,
+                                                        description='', price=400, duration=30)
+        ServiceRequestOffer.objects.create(subscription_option=self.option, offer_name='Spring', offer_description='',
+                                           offer_price=50, offer_expiry=self.day)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def row(self, **fields):
+        return dict({'service': self.service.pk, 'subscription_type': 'one-time', 'date': str(self.day),
+                     'time': '09:00'}, **fields)
+
+    def post(self, rows):
+        return self.client.post('/service_requests/bulk/', {'requests': rows}, format='json')
+
+    def test_books_every_row(self):
+        response = self.post([self.row(), self.row(time='10:00')])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'created': 2})
+        self.assertEqual(ServiceRequest.objects.filter(user=self.user, request_price=100).count(), 2)
+
+    def test_one_invalid_row_books_nothing(self):
+        yesterday = str(timezone.now().date() - datetime.timedelta(days=1))
+        response = self.post([self.row(), self.row(date=yesterday), self.row(service=0)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['errors']), {'1', '2'})
+        self.assertFalse(ServiceRequest.objects.exists())
+
+    def test_only_staff_book_for_other_users(self):
+        self.post([self.row(user=self.other.pk)])
+        self.assertEqual(list(ServiceRequest.objects.values_list('user', flat=True)), [self.user.pk])
+        self.user.is_staff = True
+        self.user.save()
+        self.post([self.row(user=self.other.pk)])
+        self.assertEqual(ServiceRequest.objects.filter(user=self.other).count(), 1)
+
+    def test_pricing_costs_no_query_per_row(self):
+        def build(count):
+            rows = [self.row(subscription_type='monthly', subscription_option=self.option.pk)] * count
+            with CaptureQueriesContext(connection) as queries:
+                bookings, errors = build_service_requests(rows, user=self.user)
+            self.assertEqual(errors, {})
+            return bookings, len(queries)
+
+        bookings, one = build(1)
+        bookings, many = build(20)
+        self.assertEqual(one, many)
+        # the option price less the unexpired offer, from the discount annotation
+        self.assertEqual({booking.request_price for booking in bookings}, {350})
+
+    def test_full_window_fails_the_whole_batch(self):
+        window = SlotWindow.objects.create(service=self.service, start=datetime.time(8), end=datetime.time(12),
+                                           capacity=2)
+        reserve(window, self.day)
+        windowless = Service.objects.create(name='Waxing', price=10)
+        created, errors = book_service_requests([self.row(service=windowless.pk), self.row(), self.row(time='10:00')],
+                                                user=self.user)
+        self.assertEqual(created, 0)
+        # both rows of the window fail, as only one place is left for two
+        self.assertEqual(set(errors), {1, 2})
+        self.assertFalse(ServiceRequest.objects.exists())
+        self.assertEqual(SlotOccupancy.objects.get(window=window, date=self.day).booked, 1)
+
+    def test_places_are_reserved_per_window(self):
+        window = SlotWindow.objects.create(service=self.service, start=datetime.time(8), end=datetime.time(12),
+                                           capacity=2)
+        created, errors = book_service_requests([self.row(), self.row(time='10:00')], user=self.user)
+        self.assertEqual((created, errors), (2, {}))
+        self.assertEqual(SlotOccupancy.objects.get(window=window, date=self.day).booked, 2)
+        created, errors = book_service_requests([self.row()], user=self.user)
+        self.assertEqual(created, 0)
+        self.assertEqual(set(errors), {0})
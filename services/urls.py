@@ -6,9 +6,13 @@ from services.views import (
     SubscriptionOptionRetrieveUpdateDestroyAPIView,
     ServiceRequestListAPIView,
     ServiceRequestRetrieveUpdateDestroyAPIView,
+    ServiceRequestCalendar,
+    ServiceRequestVisits,
     service_request_detail,
     request_service,
+    bulk_request_service,
     services,
+    service_availability,
     create_service,
     update_service,
     delete_service,
@@ -23,7 +27,11 @@ urlpatterns = [
     path('service_requests/<int:pk>/', ServiceRequestRetrieveUpdateDestroyAPIView.as_view(), name='service_request_retrieve_update_destroy'),
     path('service_requests/<int:service_request_id>/detail/', service_request_detail, name='service_request_detail'),
     path('service_requests/request/', request_service, name='request_service'),
+    path('service_requests/calendar/', ServiceRequestCalendar.as_view(), name='service_request_calendar'),
+    path('service_requests/visits/', ServiceRequestVisits.as_view(), name='service_request_visits'),
+    path('service_requests/bulk/', bulk_request_service, name='bulk_request_service'),
     path('services/all/', services, name='all_services'),
+    path('services/<int:service_id>/availability/', service_availability, name='service_availability'),
     path('services/create/', create_service, name='create_service'),
     path('services/<int:service_id>/update/', update_service, name='update_service'),
     path('services/<int:service_id>/delete/', delete_service, name='delete_service'),
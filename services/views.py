@@ -1,34 +1,67 @@
+import datetime
+import itertools
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils import timezone
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from api.conditional import ConditionalGetMixin, conditional_get, queryset_state
+from api.pagination import KeysetPagination
+from api.streaming import csv_stream, iterate_keyset, json_stream, ndjson_stream
+from services.booking import book_service_requests
+from services.cache import CatalogCacheMixin, CatalogConditionalGetMixin, cached_catalog_response, catalog_state
 from services.models import Service, SubscriptionOption, ServiceRequest
+from services.occurrences import Occurrence, occurrences_between
+from services.pricing import catalog_services, priced_options, with_payments
+from services.slots import SlotUnavailable, free_slots, release, reserve_slot
 from services.serializers import ServiceRequestSerializer, SubscriptionOptionSerializer, ServiceSerializer
 
-class ServiceListCreateAPIView(generics.ListCreateAPIView):
-    queryset = Service.objects.all()
+class ServiceListCreateAPIView(CatalogConditionalGetMixin, CatalogCacheMixin, generics.ListCreateAPIView):
     serializer_class = ServiceSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class ServiceRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Service.objects.all()
+    def get_queryset(self):
+        return catalog_services()
+
+class ServiceRetrieveUpdateDestroyAPIView(CatalogConditionalGetMixin, CatalogCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ServiceSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class SubscriptionOptionListCreateAPIView(generics.ListCreateAPIView):
-    queryset = SubscriptionOption.objects.all()
+    def get_queryset(self):
+        return catalog_services()
+
+class SubscriptionOptionListCreateAPIView(CatalogConditionalGetMixin, CatalogCacheMixin, generics.ListCreateAPIView):
     serializer_class = SubscriptionOptionSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get_queryset(self):
+        return priced_options()
     
     
-class SubscriptionOptionRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = SubscriptionOption.objects.all()
+class SubscriptionOptionRetrieveUpdateDestroyAPIView(CatalogConditionalGetMixin, CatalogCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = SubscriptionOptionSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        return priced_options()
+
+def service_request_state(request, service_request_id):
+    # the detail prices the request live from its option and the option's
+    # offer, so the catalog is part of its state too
+    state, _ = queryset_state(ServiceRequest.objects.filter(pk=service_request_id, user=request.user))
+    return f'{state}:{catalog_state(request)[0]}', None
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_get(service_request_state)
 def service_request_detail(request, service_request_id):
     try:
         service_request = ServiceRequest.objects.get(pk=service_request_id, user=request.user)
@@ -56,31 +89,226 @@ def service_request_detail(request, service_request_id):
 def request_service(request):
     serializer = ServiceRequestSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
-        serializer.save()
+        data = serializer.validated_data
+        try:
+            with transaction.atomic():
+                slot = reserve_slot(data['service'].pk, data['date'], data['time'])
+                serializer.save(slot=slot)
+        except SlotUnavailable as exc:
+            return Response({'error': 'Slot unavailable', 'message': str(exc)}, status=status.HTTP_409_CONFLICT)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     else:
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class ServiceRequestListAPIView(generics.ListAPIView):
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def service_availability(request, service_id):
+    # Free places per time window between ?start= and ?end= (dates, inclusive).
+    try:
+        start = datetime.date.fromisoformat(request.query_params.get('start', ''))
+        end = datetime.date.fromisoformat(request.query_params.get('end', ''))
+    except ValueError:
+        return Response({'error': 'Invalid request data', 'message': 'start and end must be dates (YYYY-MM-DD).'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    max_days = getattr(settings, 'SLOT_AVAILABILITY_MAX_DAYS', 62)
+    if not 0 <= (end - start).days < max_days:
+        return Response({'error': 'Invalid request data', 'message': f'end must be within {max_days} days after start.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not Service.objects.filter(pk=service_id).exists():
+        return Response({'error': 'Service not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'service': service_id, 'slots': free_slots(service_id, start, end)})
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_request_service(request):
+    # Books a whole list of service requests at once, e.g. a fleet contract.
+    # Staff may book for other users by giving a user id per row.
+    rows = request.data.get('requests') if isinstance(request.data, dict) else None
+    if not isinstance(rows, list) or not rows:
+        return Response({'error': 'Invalid request data', 'message': 'requests must be a non-empty list.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    limit = getattr(settings, 'SERVICE_REQUEST_BULK_MAX_ROWS', 1000)
+    if len(rows) > limit:
+        return Response({'error': 'Too many requests', 'message': f'A bulk booking can hold at most {limit} requests.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not request.user.is_staff:
+        rows = [{key: value for key, value in row.items() if key != 'user'} if isinstance(row, dict) else row
+                for row in rows]
+
+    created, errors = book_service_requests(rows, user=request.user)
+    if errors:
+        return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'created': created}, status=status.HTTP_201_CREATED)
+
+def calendar_bound(value):
+    # (date, time) for a date or a date and time; a bare date leaves time None
+    moment = parse_datetime(value)
+    if moment is not None:
+        if timezone.is_aware(moment):
+            moment = timezone.localtime(moment).replace(tzinfo=None)
+        return moment.date(), moment.time()
+    return parse_date(value), None
+
+class ServiceRequestCalendar(APIView):
+    # Every user's service requests from ?start= up to ?end= (dates, or dates
+    # and times; a date as end includes that whole day), ordered by date and
+    # time, optionally for one ?service= or payment ?status=. Read in keyset
+    # chunks along the (date, time, id) index and streamed, so a month of
+    # bookings costs no more memory than a day.
+    permission_classes = [permissions.IsAdminUser]
+    columns = ['id', 'date', 'time', 'user_id', 'service_id', 'subscription_type', 'subscription_option_id',
+               'car_brand', 'car_model', 'car_color', 'car_number', 'request_price', 'paid_total', 'balance', 'status']
+    # the joined names come with each row, as select_related would
+    names = {
+        'username': F('user__username'),
+        'service_name': F('service__name'),
+        'subscription_option_name': F('subscription_option__name'),
+    }
+    chunk_size = 1000
+    content_types = {
+        'json': 'application/json',
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+
+    def get(self, request):
+        export_format = request.query_params.get('export', 'json')
+        if export_format not in self.content_types:
+            raise NotFound('Unknown export format')
+        try:
+            start = calendar_bound(request.query_params.get('start', ''))
+            end = calendar_bound(request.query_params.get('end', ''))
+        except ValueError:
+            start = end = (None, None)
+        if start[0] is None or end[0] is None:
+            return Response({'error': 'Invalid request data', 'message': 'start and end must be dates or datetimes.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_days = getattr(settings, 'SERVICE_REQUEST_CALENDAR_MAX_DAYS', 366)
+        if not 0 <= (end[0] - start[0]).days <= max_days:
+            return Response({'error': 'Invalid request data', 'message': f'end must be within {max_days} days after start.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = ServiceRequest.objects.filter(date__range=(start[0], end[0]))
+        if start[1] is not None:
+            queryset = queryset.exclude(date=start[0], time__lt=start[1])
+        if end[1] is not None:
+            queryset = queryset.exclude(date=end[0], time__gte=end[1])
+        service = request.query_params.get('service')
+        if service:
+            if not service.isdigit():
+                raise NotFound('Service not found.')
+            queryset = queryset.filter(service_id=service)
+        if request.query_params.get('status'):
+            queryset = queryset.filter(status=request.query_params['status'])
+
+        chunks = iterate_keyset(queryset.values(*self.columns, **self.names), ('date', 'time', 'id'), self.chunk_size)
+        if export_format == 'csv':
+            content = csv_stream(chunks, self.columns + list(self.names))
+        elif export_format == 'ndjson':
+            content = ndjson_stream(chunks)
+        else:
+            content = json_stream(chunks)
+        response = StreamingHttpResponse(content, content_type=self.content_types[export_format])
+        if export_format != 'json':
+            response['Content-Disposition'] = f'attachment; filename="service-requests.{export_format}"'
+        return response
+
+class ServiceRequestVisits(APIView):
+    # The visits of service requests from ?start= to ?end= (dates), one per
+    # one-time request and ``count`` per monthly one, ordered by date and
+    # time and streamed like the calendar. Users see their own; staff see
+    # everyone's, or one ?user='s.
+    permission_classes = [permissions.IsAuthenticated]
+    chunk_size = 1000
+    content_types = ServiceRequestCalendar.content_types
+
+    def get(self, request):
+        export_format = request.query_params.get('export', 'json')
+        if export_format not in self.content_types:
+            raise NotFound('Unknown export format')
+        try:
+            start = parse_date(request.query_params.get('start', ''))
+            end = parse_date(request.query_params.get('end', ''))
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response({'error': 'Invalid request data', 'message': 'start and end must be dates (YYYY-MM-DD).'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_days = getattr(settings, 'SERVICE_REQUEST_CALENDAR_MAX_DAYS', 366)
+        if not 0 <= (end - start).days <= max_days:
+            return Response({'error': 'Invalid request data', 'message': f'end must be within {max_days} days after start.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = ServiceRequest.objects.all()
+        if not request.user.is_staff:
+            queryset = queryset.filter(user=request.user)
+        elif request.query_params.get('user'):
+            if not request.query_params['user'].isdigit():
+                raise NotFound('User not found.')
+            queryset = queryset.filter(user_id=request.query_params['user'])
+
+        visits = (visit._asdict() for visit in occurrences_between(start, end, queryset))
+        chunks = iter(lambda: list(itertools.islice(visits, self.chunk_size)), [])
+        if export_format == 'csv':
+            content = csv_stream(chunks, list(Occurrence._fields))
+        elif export_format == 'ndjson':
+            content = ndjson_stream(chunks)
+        else:
+            content = json_stream(chunks)
+        response = StreamingHttpResponse(content, content_type=self.content_types[export_format])
+        if export_format != 'json':
+            response['Content-Disposition'] = f'attachment; filename="visits.{export_format}"'
+        return response
+
+class ServiceRequestPagination(KeysetPagination):
+    ordering = ('-date', '-time', '-id')
+
+
+class ServiceRequestListAPIView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ServiceRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ServiceRequestPagination
 
     def get_queryset(self):
-        return ServiceRequest.objects.filter(user=self.request.user)
+        queryset = ServiceRequest.objects.filter(user=self.request.user)
+        # ?status=pending for the unpaid ones
+        if self.request.query_params.get('status'):
+            queryset = queryset.filter(status=self.request.query_params['status'])
+        return with_payments(queryset)
 
-class ServiceRequestRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ServiceRequestRetrieveUpdateDestroyAPIView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ServiceRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return ServiceRequest.objects.filter(user=self.request.user)
+        return with_payments(ServiceRequest.objects.filter(user=self.request.user))
+
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except SlotUnavailable as exc:
+            return Response({'error': 'Slot unavailable', 'message': str(exc)}, status=status.HTTP_409_CONFLICT)
+
+    def perform_update(self, serializer):
+        # a moved booking gives its place back and takes one in its new window
+        instance = serializer.instance
+        old_slot = (instance.slot_id, instance.date)
+        data = {field: serializer.validated_data.get(field, getattr(instance, field)) for field in ('service', 'date', 'time')}
+        with transaction.atomic():
+            if old_slot[0] is not None:
+                release(*old_slot)
+            slot = reserve_slot(data['service'].pk, data['date'], data['time'])
+            serializer.save(slot=slot)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_get(catalog_state)
 def services(request):
-    queryset = Service.objects.all()
-    serializer = ServiceSerializer(queryset, many=True)
-    return Response(serializer.data)
+    def render():
+        queryset = catalog_services()
+        serializer = ServiceSerializer(queryset, many=True)
+        return Response(serializer.data)
+    return cached_catalog_response(request, render)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAdminUser])
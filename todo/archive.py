@@ -0,0 +1,40 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedTodo, Todo
+
+ARCHIVED_FIELDS = ['id', 'title', 'memo', 'created', 'completed', 'completed_at', 'updated', 'user_id']
+
+
+def archive_completed_todos(days=None, batch_size=500):
+    """
+    Move todos completed more than ``days`` ago into the archive table.
+
+    Works in batches, each in its own transaction, so the hot table is never
+    locked for long. Deleting from the hot table leaves the usual tombstones,
+    which tells syncing clients the todo left the default list.
+    Returns the number of todos archived.
+    """
+    if days is None:
+        days = getattr(settings, 'TODO_ARCHIVE_AFTER_DAYS', 30)
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Todo.objects.select_for_update()
+                .filter(completed=True, completed_at__lt=cutoff)
+                .order_by('completed_at', 'id')
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            ArchivedTodo.objects.bulk_create([ArchivedTodo(**row) for row in rows], ignore_conflicts=True)
+            Todo.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return total
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from todo.archive import archive_completed_todos
+
+
+class Command(BaseCommand):
+    help = 'Move todos completed more than N days ago into the archive table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'TODO_ARCHIVE_AFTER_DAYS', 30),
+                            help='Archive todos completed more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of todos moved per transaction.')
+
+    def handle(self, *args, **options):
+        total = archive_completed_todos(days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} todos.'))
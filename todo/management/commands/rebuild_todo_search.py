@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from todo.search import rebuild_index, search_enabled
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of all todos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Number of todos read and indexed per batch.')
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            self.stdout.write(self.style.WARNING('Full-text search needs SQLite FTS5, nothing to rebuild.'))
+            return
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} todos.'))
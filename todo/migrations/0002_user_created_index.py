@@ -0,0 +1,17 @@
+# Generated by Django 3.2.19 on 2026-10-18 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['user', 'created', 'id'], name='todo_user_created_idx'),
+        ),
+    ]
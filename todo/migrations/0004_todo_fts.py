@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    # FTS5 is SQLite only; other backends fall back to a LIKE search in
+    # todo.search.TodoSearch.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS todo_todo_fts USING fts5('
+        "title, memo, owner, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO todo_todo_fts (rowid, title, memo, owner) "
+        "SELECT id, title, memo, 'u' || user_id FROM todo_todo"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS todo_todo_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0003_sync'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.19 on 2026-10-18 20:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_completed_at(apps, schema_editor):
+    # Todos completed before completed_at existed age from their last edit.
+    Todo = apps.get_model('todo', 'Todo')
+    Todo.objects.filter(completed=True, completed_at__isnull=True).update(completed_at=models.F('updated'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('todo', '0004_todo_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTodo',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=100)),
+                ('memo', models.TextField(blank=True)),
+                ('created', models.DateTimeField()),
+                ('completed', models.BooleanField(default=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated', models.DateTimeField()),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['completed_at'], name='todo_completed_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedtodo',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtodo',
+            index=models.Index(fields=['user', 'created', 'id'], name='archived_user_created_idx'),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.19 on 2026-10-18 21:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def number_existing_changes(apps, schema_editor):
+    # number every user's todos and tombstones in the order the old
+    # timestamp cursor saw them
+    Todo = apps.get_model('todo', 'Todo')
+    TodoTombstone = apps.get_model('todo', 'TodoTombstone')
+    TodoChangeCounter = apps.get_model('todo', 'TodoChangeCounter')
+    users = set(Todo.objects.values_list('user_id', flat=True).distinct())
+    users |= set(TodoTombstone.objects.values_list('user_id', flat=True).distinct())
+    for user_id in users:
+        todos = list(Todo.objects.filter(user_id=user_id).only('id', 'updated'))
+        tombstones = list(TodoTombstone.objects.filter(user_id=user_id).only('id', 'deleted'))
+        changes = sorted([(todo.updated, 0, todo.id, todo) for todo in todos]
+                         + [(tombstone.deleted, 1, tombstone.id, tombstone) for tombstone in tombstones],
+                         key=lambda change: change[:3])
+        for seq, change in enumerate(changes, start=1):
+            change[3].change_seq = seq
+        Todo.objects.bulk_update(todos, ['change_seq'], batch_size=500)
+        TodoTombstone.objects.bulk_update(tombstones, ['change_seq'], batch_size=500)
+        TodoChangeCounter.objects.create(user_id=user_id, last=len(changes))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('todo', '0006_tombstone_user_no_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoChangeCounter',
+            fields=[
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, serialize=False, to='auth.user')),
+                ('last', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='todotombstone',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['user', 'change_seq'], name='todo_user_change_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todotombstone',
+            index=models.Index(fields=['user', 'change_seq'], name='todo_tombstone_seq_idx'),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,117 @@
 from django.db import models
 
 # Create your models here.
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
 class Todo(models.Model):
     title = models.CharField(max_length=100)
     memo = models.TextField(blank=True)
     #set to current time
     created = models.DateTimeField(auto_now_add=True)
     completed = models.BooleanField(default=False)
+    #when it was last marked completed, decides when it moves to the archive
+    completed_at = models.DateTimeField(null=True, blank=True)
+    #set on every save, drives the list ETag
+    updated = models.DateTimeField(auto_now=True)
+    #taken from TodoChangeCounter on every save, drives the "changes since" sync
+    change_seq = models.BigIntegerField(default=0, editable=False)
     #user who posted this
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # serves the per-user list ordered by (-created, -id) and the
+            # keyset cursor filter in api.pagination.KeysetPagination
+            models.Index(fields=['user', 'created', 'id'], name='todo_user_created_idx'),
+            models.Index(fields=['user', 'updated'], name='todo_user_updated_idx'),
+            models.Index(fields=['user', 'change_seq'], name='todo_user_change_seq_idx'),
+            models.Index(fields=['completed_at'], name='todo_completed_at_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            self.change_seq = TodoChangeCounter.allocate(self.user_id)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+            super().save(*args, **kwargs)
+
+    def toggle_completed(self):
+        self.completed = not self.completed
+        self.completed_at = timezone.now() if self.completed else None
+
+
+class ArchivedTodo(models.Model):
+    # Completed todos moved out of todo_todo by todo.archive, so the hot
+    # table only holds what the list views actually show. The id is the one
+    # the todo had, clients keep referring to it.
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=100)
+    memo = models.TextField(blank=True)
+    created = models.DateTimeField()
+    completed = models.BooleanField(default=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField()
+    archived = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created', 'id'], name='archived_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class TodoTombstone(models.Model):
+    # Left behind when a todo is deleted so that syncing clients learn about
+    # the deletion, see todo.signals. No database constraint on user: the
+    # todos deleted along with their user leave tombstones too, and those go
+    # once the user is gone (todo.signals.drop_user_sync_state).
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False)
+    todo_id = models.BigIntegerField()
+    deleted = models.DateTimeField(auto_now_add=True)
+    change_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted'], name='todo_tombstone_user_idx'),
+            models.Index(fields=['user', 'change_seq'], name='todo_tombstone_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.todo_id}"
+
+
+class TodoChangeCounter(models.Model):
+    # The last number of each user's change sequence. Todo saves and
+    # tombstones take the next ones, and the sync cursor is such a number.
+    # No database constraint on user, for the same reason as TodoTombstone.
+    user = models.OneToOneField(User, on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True)
+    last = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.last}"
+
+    @classmethod
+    def allocate(cls, user_id, count=1):
+        """
+        Take the next ``count`` numbers of the user's change sequence and
+        return the first. Call it inside the transaction that writes the
+        changes.
+
+        The UPDATE keeps the counter row locked until that transaction ends,
+        so the next writer of the same user waits for it: numbers become
+        visible in the order they were handed out, and a reader that has
+        seen number n has seen every change numbered below it. A timestamp
+        can't promise that, a transaction that started earlier may commit
+        later.
+        """
+        cls.objects.bulk_create([cls(user_id=user_id)], ignore_conflicts=True)
+        cls.objects.filter(user_id=user_id).update(last=F('last') + count)
+        return cls.objects.filter(user_id=user_id).values_list('last', flat=True).get() - count + 1
@@ -0,0 +1,131 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Todo
+
+FTS_TABLE = 'todo_todo_fts'
+
+
+def search_enabled():
+    # The FTS5 table only exists on SQLite, see migration 0004_todo_fts.
+    return connection.vendor == 'sqlite'
+
+
+def _owner(user_id):
+    # The owner is stored as a token so the per-user restriction is part of
+    # the index lookup instead of a filter over every user's matches.
+    return f'u{user_id}'
+
+
+def match_query(text):
+    """
+    Turn free text typed by a user into a safe FTS5 MATCH expression.
+
+    Every word is quoted so FTS5 operators in the input are taken literally,
+    and the last word is a prefix query for search-as-you-type.
+    """
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    return ' '.join(terms)
+
+
+def index_todos(todos):
+    if not search_enabled():
+        return
+    todos = list(todos)
+    if not todos:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(todo.pk,) for todo in todos])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, memo, owner) VALUES (%s, %s, %s, %s)',
+            [(todo.pk, todo.title, todo.memo, _owner(todo.user_id)) for todo in todos],
+        )
+
+
+def unindex_todos(ids):
+    if not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+
+
+def rebuild_index(batch_size=2000):
+    """Drop every indexed row and re-index all todos in batches."""
+    if not search_enabled():
+        return 0
+    total = 0
+    last_id = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        while True:
+            rows = list(
+                Todo.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'title', 'memo', 'user_id')[:batch_size]
+            )
+            if not rows:
+                break
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, memo, owner) VALUES (%s, %s, %s, %s)',
+                [(pk, title, memo, _owner(user_id)) for pk, title, memo, user_id in rows],
+            )
+            total += len(rows)
+            last_id = rows[-1][0]
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+class TodoSearch:
+    """
+    Ranked full-text search over one user's todos.
+
+    Supports ``count()`` and slicing, which is all DRF's
+    ``LimitOffsetPagination`` needs, so only the requested page is loaded.
+    Title matches weigh more than memo matches.
+    """
+
+    def __init__(self, user, text):
+        self.user = user
+        self.words = re.findall(r'\w+', text or '')
+        self.match = match_query(text)
+
+    def _fallback(self):
+        queryset = Todo.objects.filter(user=self.user)
+        for word in self.words:
+            queryset = queryset.filter(Q(title__icontains=word) | Q(memo__icontains=word))
+        return queryset.order_by('-created', '-id')
+
+    def _expression(self):
+        return f'owner:{_owner(self.user.pk)} AND {{title memo}}: ({self.match})'
+
+    def count(self):
+        if not self.match:
+            return 0
+        if not search_enabled():
+            return self._fallback().count()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [self._expression()])
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step is not None:
+            raise TypeError('TodoSearch only supports slicing')
+        if not self.match:
+            return []
+        if not search_enabled():
+            return list(self._fallback()[item])
+        start = item.start or 0
+        limit = -1 if item.stop is None else max(item.stop - start, 0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, 10.0, 1.0, 0.0) LIMIT %s OFFSET %s',
+                [self._expression(), limit, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        todos = Todo.objects.in_bulk(ids)
+        return [todos[pk] for pk in ids if pk in todos]
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Todo, TodoChangeCounter, TodoTombstone
+from .search import index_todos, unindex_todos
+
+
+@receiver(post_delete, sender=Todo)
+def record_tombstone(sender, instance, **kwargs):
+    # runs inside the delete's transaction, which holds the counter from here on
+    TodoTombstone.objects.create(user_id=instance.user_id, todo_id=instance.pk,
+                                 change_seq=TodoChangeCounter.allocate(instance.user_id))
+
+
+@receiver(post_delete, sender=User)
+def drop_user_sync_state(sender, instance, **kwargs):
+    # after the cascade, so this also catches the tombstones it just left
+    TodoTombstone.objects.filter(user_id=instance.pk).delete()
+    TodoChangeCounter.objects.filter(user_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Todo)
+def update_search_index(sender, instance, **kwargs):
+    index_todos([instance])
+
+
+@receiver(post_delete, sender=Todo)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_todos([instance.pk])
@@ -1,3 +1,25 @@
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Todo, TodoTombstone
+
+
+class TombstoneTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+
+    def test_deleting_a_todo_leaves_a_tombstone(self):
+        todo = Todo.objects.create(user=self.user, title='milk')
+        todo_id = todo.pk
+        todo.delete()
+        self.assertTrue(TodoTombstone.objects.filter(user=self.user, todo_id=todo_id).exists())
+
+    def test_deleting_a_user_with_todos(self):
+        Todo.objects.create(user=self.user, title='milk')
+        Todo.objects.create(user=self.user, title='bread').delete()
+        self.user.delete()
+        # the constraints are deferred on SQLite, check them now rather than at commit
+        connection.check_constraints()
+        self.assertFalse(Todo.objects.exists())
+        self.assertFalse(TodoTombstone.objects.exists())